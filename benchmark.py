@@ -0,0 +1,266 @@
+import os
+import sys
+import json
+import time
+import fnmatch
+import platform
+import contextlib
+import resource
+import subprocess
+
+import numpy as np
+
+from main import AITextDetectorML, DEFAULT_ARTIFACT_DIR, DEFAULT_LENGTH_BUCKETS, SENTENCE_PATTERN
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_FILES = ('ia.txt', 'humano.txt', 'exemplo_texto_ai.txt')
+
+# Tamanhos aproximados (em palavras) das entradas de latência
+INPUT_SIZES = {'short': 30, 'medium': 250, 'long': 2000}
+DEFAULT_BATCH_SIZES = (1, 8, 32, 128)
+DEFAULT_SEED = 1234
+
+# Métricas em que um valor maior é melhor; nas demais, menor é melhor
+HIGHER_IS_BETTER = ('throughput',)
+
+# Métricas principais, as únicas que fazem `--baseline` falhar; as demais são só informadas
+GATED_METRICS = (
+    'latency_ms.*.p50', 'latency_ms.*.p95', 'throughput.*', 'cold_start.total_seconds', 'peak_rss_mb',
+)
+
+# Variações absolutas abaixo destas (na unidade da métrica) são ruído e não contam como regressão
+MIN_ABSOLUTE_CHANGE = {'latency_ms': 1.0, 'cold_start': 0.1, 'peak_rss_mb': 16.0}
+
+# Rodadas das medições que entram no gate; média, p50 e inicialização a frio ficam com a melhor
+DEFAULT_ROUNDS = 5
+COLD_START_ROUNDS = 3
+
+
+def build_inputs(seed=DEFAULT_SEED):
+    """Monta entradas curta, média e longa a partir dos textos de exemplo do repositório
+
+    Os textos são quebrados em sentenças e recombinados (com embaralhamento
+    determinístico por `seed`) até atingir o tamanho de `INPUT_SIZES`.
+    """
+    rng = np.random.default_rng(seed)
+    sentences = []
+    for name in SAMPLE_FILES:
+        with open(os.path.join(BASE_DIR, name), 'r', encoding='utf-8') as file:
+            sentences.extend(s.strip() + '.' for s in SENTENCE_PATTERN.findall(file.read()) if s.strip())
+
+    inputs = {}
+    for label, target_words in INPUT_SIZES.items():
+        words = []
+        while len(words) < target_words:
+            for i in rng.permutation(len(sentences)):
+                words.extend(sentences[i].split())
+                if len(words) >= target_words:
+                    break
+        inputs[label] = ' '.join(words[:target_words])
+    return inputs
+
+
+def _percentiles_ms(samples):
+    samples = np.array(samples) * 1000
+    return {
+        'mean': float(samples.mean()),
+        'p50': float(np.percentile(samples, 50)),
+        'p95': float(np.percentile(samples, 95)),
+        'p99': float(np.percentile(samples, 99)),
+    }
+
+
+def _timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _best_percentiles_ms(function, repeat, rounds=DEFAULT_ROUNDS):
+    """Percentis (ms) de `repeat` execuções divididas em `rounds` rodadas
+
+    p95/p99 usam todas as execuções juntas, para não subestimar a cauda;
+    média e p50 ficam com a melhor rodada, a menos afetada por ruído.
+    """
+    per_round = [_timed(function, max(repeat // rounds, 1)) for _ in range(rounds)]
+    result = _percentiles_ms([sample for samples in per_round for sample in samples])
+    round_percentiles = [_percentiles_ms(samples) for samples in per_round]
+    for key in ('mean', 'p50'):
+        result[key] = min(percentiles[key] for percentiles in round_percentiles)
+    return result
+
+
+def measure_stages(detector, text, repeat):
+    """Mediana (ms) de cada etapa fora do modelo: tokenização, estatísticas, heurísticas e relatório"""
+    stats_list = []
+    stats_samples = _timed(lambda: stats_list.append(detector._text_stats(text)), repeat)
+
+    # Cada medição recebe um TextStats novo, para não aproveitar valores já calculados
+    stats_iter = iter(stats_list)
+    heuristics_samples = _timed(lambda: detector._identify_suspicious_parts(text, next(stats_iter)), repeat)
+    stats_iter = iter(stats_list)
+    report_samples = _timed(lambda: detector._generate_report(50.0, text, next(stats_iter)), repeat)
+
+    return {
+        'tokenize': _percentiles_ms(_timed(lambda: detector._prepare_sequences([text]), repeat))['p50'],
+        'text_stats': _percentiles_ms(stats_samples)['p50'],
+        'heuristics': _percentiles_ms(heuristics_samples)['p50'],
+        'report': _percentiles_ms(report_samples)['p50'],
+    }
+
+
+def measure_cold_start(artifact_dir, engine='numpy'):
+    """Mede, num processo novo, o tempo de importação de `main` e de `AITextDetectorML()`"""
+    script = (
+        "import sys, time, json, contextlib\n"
+        "started = time.perf_counter()\n"
+        "import main\n"
+        "imported = time.perf_counter()\n"
+        "with contextlib.redirect_stdout(sys.stderr):\n"
+        "    main.AITextDetectorML(artifact_dir=sys.argv[1], engine=sys.argv[2])\n"
+        "loaded = time.perf_counter()\n"
+        "print(json.dumps({'import_seconds': imported - started, 'load_seconds': loaded - imported}))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', script, artifact_dir, engine],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['total_seconds'] = result['import_seconds'] + result['load_seconds']
+    result['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return result
+
+
+def run_benchmarks(artifact_dir=DEFAULT_ARTIFACT_DIR, repeat=50, batch_sizes=DEFAULT_BATCH_SIZES,
+                   seed=DEFAULT_SEED, cold_start=True, engine='numpy', length_buckets=DEFAULT_LENGTH_BUCKETS):
+    """Executa todos os benchmarks e retorna um dicionário serializável em JSON"""
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'repeat': repeat,
+            'seed': seed,
+            'engine': engine,
+            'length_buckets': list(length_buckets),
+        }
+    }
+
+    if cold_start:
+        # Garante o artefato antes, para medir o carregamento e não o treino
+        AITextDetectorML(artifact_dir=artifact_dir, engine=engine)
+        results['cold_start'] = min(
+            (measure_cold_start(artifact_dir, engine) for _ in range(COLD_START_ROUNDS)),
+            key=lambda result: result['total_seconds']
+        )
+
+    # Sem cache, para medir o custo real de cada análise
+    detector = AITextDetectorML(artifact_dir=artifact_dir, cache=None, engine=engine, length_buckets=length_buckets)
+    results['environment']['model_version'] = detector.model_version
+    inputs = build_inputs(seed)
+
+    results['latency_ms'] = {}
+    results['stages_ms'] = {}
+    for label, text in inputs.items():
+        detector.analyze_text(text)
+        results['latency_ms'][label] = _best_percentiles_ms(lambda: detector.analyze_text(text), repeat)
+        results['stages_ms'][label] = measure_stages(detector, text, repeat)
+
+    results['throughput'] = {}
+    corpus = list(inputs.values())
+    for batch_size in batch_sizes:
+        texts = [corpus[i % len(corpus)] for i in range(max(batch_size * 4, 64))]
+        detector.analyze_texts(texts[:batch_size], batch_size=batch_size)
+        elapsed = min(_timed(lambda: detector.analyze_texts(texts, batch_size=batch_size), 3))
+        results['throughput'][f'batch_{batch_size}'] = len(texts) / elapsed
+
+    results['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return results
+
+
+def _flatten(metrics, prefix=''):
+    flat = {}
+    for key, value in metrics.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{name}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def is_gated(name):
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in GATED_METRICS)
+
+
+def compare(current, baseline, threshold):
+    """Lista as métricas que pioraram mais que `threshold` (fração) em relação à `baseline`
+
+    Cada item indica em `gated` se a métrica é uma das `GATED_METRICS`;
+    nelas, pioras menores que `MIN_ABSOLUTE_CHANGE` são ignoradas.
+    """
+    regressions = []
+    current_flat = _flatten({k: v for k, v in current.items() if k != 'environment'})
+    baseline_flat = _flatten({k: v for k, v in baseline.items() if k != 'environment'})
+
+    for name, value in sorted(current_flat.items()):
+        reference = baseline_flat.get(name)
+        if not reference or reference <= 0:
+            continue
+
+        if name.split('.')[0] in HIGHER_IS_BETTER:
+            change = (reference - value) / reference
+        else:
+            change = (value - reference) / reference
+
+        if change <= threshold:
+            continue
+        gated = is_gated(name)
+        if gated and abs(value - reference) < MIN_ABSOLUTE_CHANGE.get(name.split('.')[0], 0):
+            continue
+        regressions.append({
+            'metric': name, 'baseline': reference, 'current': value, 'regression': change, 'gated': gated
+        })
+
+    return regressions
+
+
+def run(args):
+    """Ponto de entrada do subcomando `bench`"""
+    # Mensagens do modelo vão para stderr para não misturar com o JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        results = run_benchmarks(
+            artifact_dir=args.artifact_dir,
+            repeat=args.repeat,
+            batch_sizes=args.batch_sizes,
+            seed=args.seed,
+            cold_start=not args.skip_cold_start,
+            engine=args.engine,
+            length_buckets=() if args.no_buckets else DEFAULT_LENGTH_BUCKETS
+        )
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+
+        regressions = compare(results, baseline, args.max_regression)
+        for regression in regressions:
+            kind = "Regressão" if regression['gated'] else "Variação (informativa)"
+            print(
+                f"{kind} em {regression['metric']}: {regression['baseline']:.3f} -> "
+                f"{regression['current']:.3f} (piora de {regression['regression'] * 100:.1f}%)",
+                file=sys.stderr
+            )
+        if any(regression['gated'] for regression in regressions):
+            raise SystemExit(1)
@@ -0,0 +1,131 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+# Espaços que o tokenizer trata como separadores; removê-los das pontas não muda o resultado
+NORMALIZED_WHITESPACE = ' \t\n'
+
+
+class ResultCache:
+    """Cache de resultados de análise endereçado pelo conteúdo do texto
+
+    A chave é o hash do texto normalizado mais a versão do modelo, então um
+    retreino invalida automaticamente os resultados anteriores. Há um nível
+    em memória (LRU limitado a `max_entries`) e, se `path` for informado, um
+    nível persistente em SQLite compartilhado entre execuções.
+    """
+
+    def __init__(self, max_entries=1024, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.model_version = None
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, model_version TEXT, value TEXT, created_at REAL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(text, model_version, variant='', normalize=True):
+        """Hash do texto (normalizado, se `normalize`) + versão do modelo + variante da análise"""
+        text = text or ''
+        if normalize:
+            text = text.strip(NORMALIZED_WHITESPACE)
+        payload = f"{model_version}\0{variant}\0{text}".encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()
+
+    def bind_model(self, model_version):
+        """Associa o cache a uma versão do modelo, descartando entradas de outras versões"""
+        with self._lock:
+            if model_version == self.model_version:
+                return
+            self.model_version = model_version
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results WHERE model_version != ?", (model_version,))
+                self._db.commit()
+
+    def get(self, key):
+        """Retorna o resultado guardado para `key` ou None"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = tuple(json.loads(row[0]))
+                    self._remember(key, value)
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """Guarda `value` (tupla serializável em JSON) nos dois níveis"""
+        self.put_many([(key, value)])
+
+    def put_many(self, items):
+        """Guarda vários pares (chave, valor) numa única transação do SQLite"""
+        items = list(items)
+        with self._lock:
+            for key, value in items:
+                self._remember(key, value)
+            if self._db is not None and items:
+                now = time.time()
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO results (key, model_version, value, created_at) VALUES (?, ?, ?, ?)",
+                    [(key, self.model_version, json.dumps(value, ensure_ascii=False), now) for key, value in items]
+                )
+                self._db.commit()
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Remove todas as entradas dos dois níveis"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def stats(self):
+        """Contadores de acertos, falhas e remoções"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._memory),
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,415 @@
+import os
+import sys
+import json
+import time
+import zlib
+import hashlib
+
+import numpy as np
+
+from main import DEFAULT_CASCADE_PATH, WORD_PATTERN
+
+
+CASCADE_FORMAT_VERSION = 1
+DEFAULT_HASH_BITS = 18
+DEFAULT_NGRAM_RANGE = (1, 2)
+
+# Scores (0-100) do estágio linear dentro desta faixa, inclusive, seguem para a BiLSTM;
+# mesmos limiares de confiança de `_generate_report`
+DEFAULT_ESCALATION_BAND = (30, 70)
+
+# Abaixo disso, a calibração de Platt (ajustada na validação) é pouco confiável
+MIN_CALIBRATION_SAMPLES = 200
+
+# Estágio que decidiu cada texto
+STAGES = ('linear', 'bilstm')
+
+# Características estilométricas de `TextStats` (as mesmas de `_identify_suspicious_parts`)
+STYLOMETRIC_FEATURES = (
+    'connectors_per_word', 'sentence_length_mean', 'sentence_length_std', 'repeated_start_ratio', 'log_words'
+)
+
+
+def stylometric_features(stats):
+    """Vetor com as `STYLOMETRIC_FEATURES` de um `TextStats`"""
+    sentences = stats.sentence_count
+    return np.array([
+        sum(stats.connector_counts.values()) / max(stats.word_count, 1),
+        stats.feature('sentence_length_mean'),
+        stats.feature('sentence_length_std'),
+        stats.feature('most_common_start')[1] / sentences if sentences else 0.0,
+        np.log1p(stats.word_count),
+    ], dtype=np.float32)
+
+
+def _sigmoid(x):
+    return 0.5 * (1 + np.tanh(0.5 * x))
+
+
+class HashedLogisticRegression:
+    """Regressão logística sobre n-gramas de palavras com hashing e características estilométricas
+
+    Cada texto vira um vetor esparso: os n-gramas de palavras (minúsculas,
+    separadas como no tokenizer) são espalhados em 2**`hash_bits` posições
+    por CRC32, com contagens sublineares normalizadas (norma L2), seguidos
+    das `STYLOMETRIC_FEATURES` padronizadas. O treino é por mini-lotes com
+    Adagrad, só com NumPy; depois, uma escala de Platt ajustada numa parte
+    separada dos dados calibra a probabilidade, que é usada pela cascata
+    para decidir o que vai para a BiLSTM.
+    """
+
+    def __init__(self, hash_bits=DEFAULT_HASH_BITS, ngram_range=DEFAULT_NGRAM_RANGE):
+        self.hash_bits = hash_bits
+        self.ngram_range = tuple(ngram_range)
+        self.hash_mask = (1 << hash_bits) - 1
+        dimension = (1 << hash_bits) + len(STYLOMETRIC_FEATURES)
+
+        self.weights = np.zeros(dimension, dtype=np.float32)
+        self.bias = 0.0
+        self.dense_mean = np.zeros(len(STYLOMETRIC_FEATURES), dtype=np.float32)
+        self.dense_std = np.ones(len(STYLOMETRIC_FEATURES), dtype=np.float32)
+        self.calibration = (1.0, 0.0)
+        self.version = None
+        self.info = {}
+
+    def _hashed_row(self, text):
+        words = WORD_PATTERN.findall(text.lower())
+        low, high = self.ngram_range
+        grams = []
+        for n in range(low, high + 1):
+            grams.extend(' '.join(words[i:i + n]) for i in range(len(words) - n + 1))
+
+        hashes = np.fromiter(
+            (zlib.crc32(gram.encode('utf-8')) & self.hash_mask for gram in grams), dtype=np.int64, count=len(grams)
+        )
+        indices, counts = np.unique(hashes, return_counts=True)
+        values = np.log1p(counts).astype(np.float32)
+        norm = np.linalg.norm(values)
+        return indices, values / norm if norm else values
+
+    def features(self, texts, stats):
+        """Matriz esparsa (indptr, índices, valores) dos textos, com as estatísticas já calculadas em `stats`"""
+        dense = (np.stack([stylometric_features(s) for s in stats]) - self.dense_mean) / self.dense_std
+        dense_indices = np.arange(1 << self.hash_bits, len(self.weights))
+        return self._csr([self._hashed_row(text) for text in texts], dense, dense_indices)
+
+    @staticmethod
+    def _csr(rows, dense, dense_indices):
+        indices = []
+        values = []
+        for (row_indices, row_values), dense_values in zip(rows, dense):
+            indices.extend((row_indices, dense_indices))
+            values.extend((row_values, dense_values.astype(np.float32)))
+        lengths = [len(row_indices) + len(dense_indices) for row_indices, _ in rows]
+        indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        return indptr, np.concatenate(indices), np.concatenate(values)
+
+    def decision(self, matrix):
+        """Logits (antes da calibração) de cada linha da matriz esparsa"""
+        indptr, indices, values = matrix
+        # Toda linha tem ao menos as características estilométricas, então nenhuma fica vazia
+        return np.add.reduceat(self.weights[indices] * values, indptr[:-1]) + self.bias
+
+    def predict_proba(self, texts, stats):
+        """Probabilidade calibrada (0-1) de cada texto ser gerado por IA"""
+        if not len(texts):
+            return np.zeros(0, dtype=np.float32)
+        scale, shift = self.calibration
+        return _sigmoid(scale * self.decision(self.features(texts, stats)) + shift).astype(np.float32)
+
+    def fit(self, texts, labels, stats, epochs=10, batch_size=256, learning_rate=0.5, l2=1e-6,
+            validation_fraction=0.2, seed=0):
+        """Treina com `texts` (0 = humano, 1 = IA) e calibra numa fração separada dos dados"""
+        labels = np.asarray(labels, dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(texts))
+        validation_size = int(len(texts) * validation_fraction) if len(np.unique(labels)) > 1 else 0
+        validation, train = order[:validation_size], order[validation_size:]
+
+        dense = np.stack([stylometric_features(s) for s in stats])
+        self.dense_mean = dense[train].mean(axis=0)
+        self.dense_std = dense[train].std(axis=0) + 1e-6
+        dense = (dense - self.dense_mean) / self.dense_std
+
+        dense_indices = np.arange(1 << self.hash_bits, len(self.weights))
+        rows = [self._hashed_row(text) for text in texts]
+        self.weights.fill(0)
+        self.bias = 0.0
+        weight_squares = np.zeros_like(self.weights)
+        bias_squares = 0.0
+
+        for _ in range(epochs):
+            rng.shuffle(train)
+            for start in range(0, len(train), batch_size):
+                batch = train[start:start + batch_size]
+                indptr, indices, values = self._csr([rows[i] for i in batch], dense[batch], dense_indices)
+                errors = _sigmoid(self.decision((indptr, indices, values))) - labels[batch]
+
+                # Gradiente esparso: cada valor contribui com o erro da sua linha
+                per_value = values * np.repeat(errors, np.diff(indptr)) / len(batch)
+                gradient = np.bincount(indices, weights=per_value, minlength=len(self.weights))
+                gradient += l2 * self.weights
+                weight_squares += gradient * gradient
+                self.weights -= (learning_rate * gradient / (np.sqrt(weight_squares) + 1e-8)).astype(np.float32)
+
+                bias_gradient = float(errors.mean())
+                bias_squares += bias_gradient * bias_gradient
+                self.bias -= learning_rate * bias_gradient / (np.sqrt(bias_squares) + 1e-8)
+
+        self.calibration = (1.0, 0.0)
+        if validation_size:
+            logits = self.decision(self._csr([rows[i] for i in validation], dense[validation], dense_indices))
+            self.calibration = self._platt(logits, labels[validation])
+            accuracy = float(((_sigmoid(self.calibration[0] * logits + self.calibration[1]) >= 0.5)
+                              == labels[validation]).mean())
+        else:
+            accuracy = None
+
+        self.version = hashlib.sha256(
+            self.weights.tobytes() + str(self.calibration).encode('utf-8')
+        ).hexdigest()[:16]
+        self.info = {
+            'samples': len(texts),
+            'validation_samples': int(validation_size),
+            'validation_accuracy': accuracy,
+            'epochs': epochs,
+            'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        return self
+
+    @staticmethod
+    def _platt(logits, labels, iterations=100):
+        """Escala de Platt (a, b) por Newton com busca linear (Lin, Lin e Weng), com os alvos suavizados de Platt"""
+        logits = logits.astype(np.float64)
+        positives = labels.sum()
+        negatives = len(labels) - positives
+        targets = np.where(labels > 0, (positives + 1) / (positives + 2), 1 / (negatives + 2))
+
+        def loss(scale, shift):
+            margins = scale * logits + shift
+            # log(1 + e^m) - t·m, em forma estável
+            return float(np.sum(np.logaddexp(0, margins) - targets * margins))
+
+        # Parte da identidade: os logits já vêm de uma regressão logística
+        scale, shift = 1.0, 0.0
+        current = loss(scale, shift)
+        for _ in range(iterations):
+            probabilities = _sigmoid(scale * logits + shift)
+            errors = probabilities - targets
+            weights = probabilities * (1 - probabilities)
+            gradient = np.array([np.dot(errors, logits), errors.sum()])
+            if np.abs(gradient).max() < 1e-6:
+                break
+            hessian = np.array([
+                [np.dot(weights, logits * logits), np.dot(weights, logits)],
+                [np.dot(weights, logits), weights.sum()],
+            ]) + 1e-8 * np.eye(2)
+            step = np.linalg.solve(hessian, gradient)
+
+            # Reduz o passo até o custo cair o suficiente
+            size = 1.0
+            while size >= 1e-10:
+                candidate = (scale - size * step[0], shift - size * step[1])
+                value = loss(*candidate)
+                if value < current - 1e-4 * size * np.dot(gradient, step):
+                    break
+                size /= 2
+            else:
+                break
+            (scale, shift), current = candidate, value
+        return float(scale), float(shift)
+
+    def save(self, path):
+        config = {
+            'format_version': CASCADE_FORMAT_VERSION,
+            'hash_bits': self.hash_bits,
+            'ngram_range': list(self.ngram_range),
+            'bias': float(self.bias),
+            'calibration': list(self.calibration),
+            'version': self.version,
+            'info': self.info,
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            np.savez(file, weights=self.weights, dense_mean=self.dense_mean, dense_std=self.dense_std,
+                     config=np.array(json.dumps(config)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            config = json.loads(str(data['config']))
+            if config.get('format_version') != CASCADE_FORMAT_VERSION:
+                raise ValueError(f"Formato de modelo da cascata não suportado: {path}")
+            model = cls(config['hash_bits'], config['ngram_range'])
+            model.weights = data['weights']
+            model.dense_mean = data['dense_mean']
+            model.dense_std = data['dense_std']
+        model.bias = config['bias']
+        model.calibration = tuple(config['calibration'])
+        model.version = config['version']
+        model.info = config['info']
+        return model
+
+
+class Cascade:
+    """Cascata barata primeiro: o estágio linear decide sozinho fora da faixa de escalonamento
+
+    Textos cujo score calibrado do `HashedLogisticRegression` (0-100) cai
+    dentro de `band` (limites inclusivos) são pontuados de novo pela BiLSTM
+    do detector; os demais ficam com o score linear. Usada por
+    `AITextDetectorML(cascade=...)`.
+    """
+
+    def __init__(self, model, band=DEFAULT_ESCALATION_BAND):
+        if band is not None and not 0 <= band[0] <= band[1] <= 100:
+            raise ValueError("A faixa de escalonamento deve ter 0 <= início <= fim <= 100")
+        self.model = model
+        # None: o estágio linear decide todos os textos
+        self.band = None if band is None else (float(band[0]), float(band[1]))
+
+    @property
+    def variant(self):
+        """Identifica modelo e faixa nas chaves do cache de resultados"""
+        band = 'none' if self.band is None else f"{self.band[0]:g}:{self.band[1]:g}"
+        return f"cascade:{self.model.version}:{band}"
+
+    def predict_proba(self, texts, stats):
+        return self.model.predict_proba(texts, stats)
+
+    def escalate(self, probabilities):
+        """Máscara dos textos que seguem para a BiLSTM"""
+        scores = np.asarray(probabilities) * 100
+        if self.band is None:
+            return np.zeros(len(scores), dtype=bool)
+        return (scores >= self.band[0]) & (scores <= self.band[1])
+
+
+def train_linear_model(texts, labels, connector_matcher=None, **options):
+    """Treina um `HashedLogisticRegression` com as estatísticas de texto usadas pelo detector"""
+    from main import TextStats
+
+    stats = [TextStats(text, connector_matcher) for text in texts]
+    return HashedLogisticRegression().fit(texts, labels, stats, **options)
+
+
+def load_linear_model(path=DEFAULT_CASCADE_PATH):
+    """Carrega o modelo do estágio linear salvo por `cascade train`"""
+    if not os.path.isfile(path):
+        raise FileNotFoundError(
+            f"Estágio linear da cascata não encontrado em {path}; "
+            "treine-o num corpus rotulado com 'python main.py cascade train <arquivos>'"
+        )
+    return HashedLogisticRegression.load(path)
+
+
+def warn_small_calibration(model):
+    """Avisa (em stderr) se a escala de Platt foi ajustada em poucos textos de validação"""
+    validation_samples = model.info.get('validation_samples', 0)
+    if validation_samples < MIN_CALIBRATION_SAMPLES:
+        print(
+            f"Aviso: a calibração do estágio linear usou só {validation_samples} textos de validação "
+            f"(recomendado: {MIN_CALIBRATION_SAMPLES} ou mais); treine com mais dados rotulados",
+            file=sys.stderr
+        )
+
+
+def parse_band(value):
+    """Converte 'início:fim' (ex.: '30:70') numa faixa de escalonamento"""
+    try:
+        low, high = (float(part) for part in value.split(':'))
+    except ValueError:
+        raise ValueError(f"Faixa inválida: {value} (use início:fim, ex.: 30:70)")
+    return low, high
+
+
+def load_labeled_texts(sources, text_field='text', label_field='label', limit=None):
+    """Textos e rótulos válidos dos shards (CSV, JSONL ou Parquet), até `limit` registros"""
+    from training import expand_sources, iter_labeled_records
+
+    texts = []
+    labels = []
+    for shard in expand_sources(sources):
+        for text, label in iter_labeled_records(shard, text_field, label_field):
+            if text is None:
+                continue
+            texts.append(text)
+            labels.append(label)
+            if limit and len(texts) >= limit:
+                return texts, labels
+    return texts, labels
+
+
+def evaluate(detector, model, texts, labels, bands, batch_size=64):
+    """Compara acurácia e vazão da BiLSTM sozinha, do estágio linear sozinho e da cascata em cada faixa
+
+    Cada configuração roda `analyze_texts` de ponta a ponta (heurísticas e
+    relatório incluídos, sem cache). A concordância é a fração de textos
+    com a mesma decisão (>= 50%) da BiLSTM sozinha.
+    """
+    labels = np.asarray(labels)
+    configurations = [('bilstm', None), ('linear', Cascade(model, None))]
+    configurations += [(f"cascade {low:g}-{high:g}", Cascade(model, (low, high))) for low, high in bands]
+
+    cache, original_cascade = detector.cache, detector.cascade
+    detector.cache = None
+    rows = []
+    reference = None
+    try:
+        for name, cascade in configurations:
+            detector.cascade = cascade
+            started = time.perf_counter()
+            results = detector.analyze_texts(texts, batch_size=batch_size)
+            elapsed = time.perf_counter() - started
+
+            decisions = np.array([result[0] >= 50 for result in results])
+            if reference is None:
+                reference = decisions
+            escalated = sum(1 for result in results if len(result) > 3 and result[3] == 'bilstm')
+            rows.append({
+                'configuration': name,
+                'accuracy': round(float((decisions == labels).mean()), 4),
+                'agreement_with_bilstm': round(float((decisions == reference).mean()), 4),
+                'escalated': round(escalated / len(texts), 4) if cascade is not None else 1.0,
+                'texts_per_second': round(len(texts) / elapsed, 1),
+                'ms_per_text': round(elapsed * 1000 / len(texts), 3),
+            })
+    finally:
+        detector.cache, detector.cascade = cache, original_cascade
+    return rows
+
+
+def run(args):
+    """Subcomando `cascade`: treina o estágio linear ou avalia a troca entre acurácia e vazão"""
+    from main import AITextDetectorML
+
+    detector = AITextDetectorML(artifact_dir=args.artifact_dir, engine=args.engine)
+    texts, labels = load_labeled_texts(args.sources, args.text_field, args.label_field, args.limit)
+    if not texts:
+        raise SystemExit("Nenhum registro rotulado válido nos arquivos informados")
+
+    if args.action == 'train':
+        model = train_linear_model(texts, labels, detector.connector_matcher, epochs=args.epochs)
+        model.save(args.cascade_model)
+        print(f"Estágio linear salvo em {args.cascade_model}: {json.dumps(model.info)}")
+        warn_small_calibration(model)
+        return
+
+    try:
+        model = load_linear_model(args.cascade_model)
+    except FileNotFoundError as e:
+        raise SystemExit(str(e))
+    warn_small_calibration(model)
+    bands = [parse_band(band) for band in args.bands]
+    rows = evaluate(detector, model, texts, labels, bands, args.batch_size)
+
+    print(f"{len(texts)} textos avaliados")
+    print(f"{'configuração':<18} {'acurácia':>9} {'concord.':>9} {'escalados':>10} {'textos/s':>10} {'ms/texto':>9}")
+    for row in rows:
+        print(
+            f"{row['configuration']:<18} {row['accuracy']:>9.4f} {row['agreement_with_bilstm']:>9.4f} "
+            f"{row['escalated']:>10.2%} {row['texts_per_second']:>10.1f} {row['ms_per_text']:>9.3f}"
+        )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({'samples': len(texts), 'results': rows}, file, indent=2)
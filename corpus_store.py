@@ -0,0 +1,361 @@
+import os
+import json
+import time
+import shutil
+from itertools import chain
+
+import numpy as np
+
+from fast_tokenizer import FastTokenizer
+
+
+STORE_FORMAT_VERSION = 1
+
+# Arquivos de um store (todos no mesmo diretório)
+STORE_METADATA_FILE = 'store.json'
+STORE_TOKENIZER_FILE = 'tokenizer.json'
+TOKENS_FILE = 'tokens.int32'
+OFFSETS_FILE = 'offsets.int64'
+LABELS_FILE = 'labels.int8'
+CHARS_FILE = 'chars.int32'
+IDS_FILE = 'ids.jsonl'
+STORE_FILES = (STORE_METADATA_FILE, STORE_TOKENIZER_FILE, TOKENS_FILE, OFFSETS_FILE, LABELS_FILE, CHARS_FILE, IDS_FILE)
+
+# Rótulo gravado para documentos sem rótulo válido (corpus só de inferência)
+UNLABELED = -1
+
+# Documentos tokenizados e gravados por vez durante a ingestão
+INGEST_CHUNK_ROWS = 10000
+
+
+def _memmap(path, dtype, count):
+    """Mapeia os `count` primeiros itens do arquivo (somente leitura); arquivo vazio vira array vazio"""
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def _json_id(record_id, default):
+    """Id serializável em JSON (escalares NumPy/pandas viram tipos Python)"""
+    if record_id is None:
+        return default
+    if isinstance(record_id, np.generic):
+        return record_id.item()
+    return record_id
+
+
+class CorpusStore:
+    """Corpus pré-tokenizado em arquivos mapeados em memória
+
+    Os ids de todos os documentos ficam concatenados num único array int32
+    (`tokens.int32`), e `offsets.int64` guarda onde cada documento começa
+    (com um último offset igual ao total de tokens). Rótulos (`labels.int8`,
+    -1 sem rótulo), ids dos documentos (`ids.jsonl`, um por linha) e o
+    número de caracteres de cada texto (`chars.int32`, para a regra de texto
+    curto da análise) acompanham na mesma ordem. Os arrays são abertos com
+    `np.memmap`, então `document(i)` é uma view sem cópia e lotes para o
+    modelo leem apenas as linhas pedidas.
+
+    O store só cresce por acréscimo: `append` grava no fim dos arquivos e,
+    por último, troca `store.json` atomicamente. Só o que está registrado
+    ali vale; sobras de uma ingestão interrompida são descartadas na
+    próxima. O vocabulário que gerou os ids (`tokenizer.json`) fica no store,
+    e `vocabulary_version` permite detectar quando ele não corresponde mais
+    ao do modelo (ver `ensure_vocabulary`).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(self._file(STORE_METADATA_FILE), 'r', encoding='utf-8') as file:
+            self.metadata = json.load(file)
+        if self.metadata.get('format_version') != STORE_FORMAT_VERSION:
+            raise ValueError(f"Formato de store não suportado em {path}")
+        with open(self._file(STORE_TOKENIZER_FILE), 'r', encoding='utf-8') as file:
+            self.tokenizer_json = file.read()
+        self._ids = None
+        self._fast_tokenizer = None
+        self._map()
+
+    @staticmethod
+    def exists(path):
+        return os.path.isfile(os.path.join(path, STORE_METADATA_FILE))
+
+    @classmethod
+    def create(cls, path, tokenizer_json):
+        """Cria um store vazio em `path` para o vocabulário de `tokenizer_json` (de `Tokenizer.to_json()`)
+
+        Só substitui um diretório existente se ele for um store, estiver vazio ou tiver
+        apenas arquivos de store (restos de uma criação interrompida).
+        """
+        if os.path.exists(path):
+            if not os.path.isdir(path) or not (cls.exists(path) or set(os.listdir(path)) <= set(STORE_FILES)):
+                raise ValueError(f"{path} já existe e não é um store; escolha outro diretório")
+            shutil.rmtree(path)
+        os.makedirs(path)
+
+        for name in (TOKENS_FILE, LABELS_FILE, CHARS_FILE, IDS_FILE):
+            open(os.path.join(path, name), 'wb').close()
+        np.zeros(1, dtype=np.int64).tofile(os.path.join(path, OFFSETS_FILE))
+        with open(os.path.join(path, STORE_TOKENIZER_FILE), 'w', encoding='utf-8') as file:
+            file.write(tokenizer_json)
+
+        metadata = {
+            'format_version': STORE_FORMAT_VERSION,
+            'vocabulary_version': FastTokenizer.from_json(tokenizer_json, 1).vocabulary_version,
+            'documents': 0,
+            'tokens': 0,
+            'ids_bytes': 0,
+            'skipped': 0,
+            'sources': [],
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        cls._write_metadata(path, metadata)
+        return cls(path)
+
+    @staticmethod
+    def _write_metadata(path, metadata):
+        tmp_path = os.path.join(path, STORE_METADATA_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(metadata, file, indent=2)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, os.path.join(path, STORE_METADATA_FILE))
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _map(self):
+        documents = self.metadata['documents']
+        self.tokens = _memmap(self._file(TOKENS_FILE), np.int32, self.metadata['tokens'])
+        self.offsets = _memmap(self._file(OFFSETS_FILE), np.int64, documents + 1)
+        self.labels = _memmap(self._file(LABELS_FILE), np.int8, documents)
+        self.chars = _memmap(self._file(CHARS_FILE), np.int32, documents)
+        self._ids = None
+
+    @property
+    def vocabulary_version(self):
+        return self.metadata['vocabulary_version']
+
+    @property
+    def fast_tokenizer(self):
+        """`FastTokenizer` do vocabulário do store, usado na ingestão"""
+        if self._fast_tokenizer is None:
+            self._fast_tokenizer = FastTokenizer.from_json(self.tokenizer_json, 1)
+        return self._fast_tokenizer
+
+    @property
+    def ids(self):
+        """Ids dos documentos, na ordem do store (lidos do disco na primeira consulta)"""
+        if self._ids is None:
+            with open(self._file(IDS_FILE), 'rb') as file:
+                data = file.read(self.metadata['ids_bytes'])
+            self._ids = [json.loads(line) for line in data.splitlines()]
+        return self._ids
+
+    def __len__(self):
+        return self.metadata['documents']
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def document(self, index):
+        """Ids do documento `index`: uma view do array mapeado, sem cópia"""
+        return self.tokens[self.offsets[index]:self.offsets[index + 1]]
+
+    def padded(self, indices, max_len, out=None):
+        """Matriz int32 (len(indices) x max_len) com padding/truncamento 'post', como `FastTokenizer.encode`
+
+        Os ids são copiados do mapeamento direto para `out` (ou uma matriz
+        nova) numa única indexação vetorizada.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if out is None:
+            out = np.zeros((len(indices), max_len), dtype=np.int32)
+        elif out.shape[0] < len(indices) or out.shape[1] != max_len or out.dtype != np.int32:
+            raise ValueError(f"Buffer deve ser int32 com pelo menos {len(indices)} linhas e {max_len} colunas")
+        view = out[:len(indices)]
+        if not len(self.tokens) or not len(indices):
+            view.fill(0)
+            return view
+
+        starts = self.offsets[indices]
+        lengths = np.minimum(self.offsets[indices + 1] - starts, max_len)
+        positions = np.arange(max_len)
+        mask = positions < lengths[:, None]
+        gather = np.where(mask, starts[:, None] + positions, 0)
+        np.multiply(self.tokens[gather], mask, out=view, casting='unsafe')
+        return view
+
+    def iter_padded(self, max_len, batch_size, start=0):
+        """Gera (primeiro índice, matriz int32) em lotes consecutivos a partir de `start`
+
+        A matriz é um buffer reutilizado, válido até o próximo lote.
+        """
+        buffer = np.zeros((batch_size, max_len), dtype=np.int32)
+        for first in range(start, len(self), batch_size):
+            indices = np.arange(first, min(first + batch_size, len(self)))
+            yield first, self.padded(indices, max_len, buffer)
+
+    def _truncate_uncommitted(self):
+        """Descarta dados gravados após o último `store.json` (ingestão interrompida)"""
+        committed = {
+            TOKENS_FILE: self.metadata['tokens'] * 4,
+            OFFSETS_FILE: (self.metadata['documents'] + 1) * 8,
+            LABELS_FILE: self.metadata['documents'],
+            CHARS_FILE: self.metadata['documents'] * 4,
+            IDS_FILE: self.metadata['ids_bytes'],
+        }
+        for name, size in committed.items():
+            if os.path.getsize(self._file(name)) != size:
+                with open(self._file(name), 'r+b') as file:
+                    file.truncate(size)
+
+    def append(self, records, source=None):
+        """Tokeniza e acrescenta (id, texto, rótulo) ao fim do store; retorna quantos entraram
+
+        Registros sem texto são contados em `skipped`. `source` (assinatura
+        de `_source_signature`) é registrada junto, no mesmo commit.
+        """
+        self._truncate_uncommitted()
+        tokenizer = self.fast_tokenizer
+        metadata = dict(self.metadata)
+        added = 0
+        skipped = 0
+
+        with open(self._file(TOKENS_FILE), 'ab') as tokens_file, \
+                open(self._file(OFFSETS_FILE), 'ab') as offsets_file, \
+                open(self._file(LABELS_FILE), 'ab') as labels_file, \
+                open(self._file(CHARS_FILE), 'ab') as chars_file, \
+                open(self._file(IDS_FILE), 'ab') as ids_file:
+            chunk = []
+            for record in chain(records, [None]):
+                if record is not None:
+                    record_id, text, label = record
+                    if not isinstance(text, str) or not text.strip():
+                        skipped += 1
+                        continue
+                    chunk.append((record_id, text, label))
+                    if len(chunk) < INGEST_CHUNK_ROWS:
+                        continue
+                if not chunk:
+                    continue
+
+                sequences = tokenizer.texts_to_sequences([text for _, text, _ in chunk])
+                lengths = np.fromiter(map(len, sequences), dtype=np.int64, count=len(sequences))
+                np.fromiter(chain.from_iterable(sequences), dtype=np.int32, count=int(lengths.sum())) \
+                    .tofile(tokens_file)
+                (metadata['tokens'] + np.cumsum(lengths)).tofile(offsets_file)
+                np.array([UNLABELED if label is None else label for _, _, label in chunk], dtype=np.int8) \
+                    .tofile(labels_file)
+                np.array([len(text.strip()) for _, text, _ in chunk], dtype=np.int32).tofile(chars_file)
+                ids = ''.join(json.dumps(record_id, ensure_ascii=False) + '\n' for record_id, _, _ in chunk)
+                metadata['ids_bytes'] += ids_file.write(ids.encode('utf-8'))
+
+                metadata['tokens'] += int(lengths.sum())
+                metadata['documents'] += len(chunk)
+                added += len(chunk)
+                chunk = []
+
+            for file in (tokens_file, offsets_file, labels_file, chars_file, ids_file):
+                file.flush()
+                os.fsync(file.fileno())
+
+        metadata['skipped'] += skipped
+        if source is not None:
+            metadata['sources'] = metadata['sources'] + [dict(source, documents=added, skipped=skipped)]
+        metadata['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self._write_metadata(self.path, metadata)
+        self.metadata = metadata
+        self._map()
+        return added
+
+    def ingest(self, sources, text_field='text', label_field='label', id_field='id'):
+        """Acrescenta os shards de `sources` (CSV, JSONL ou Parquet) ainda não ingeridos
+
+        Um shard já registrado com o mesmo tamanho e data de modificação é
+        pulado, então repetir o comando com mais arquivos só processa os novos.
+        Retorna o número de documentos acrescentados.
+        """
+        from training import expand_sources, iter_rows, parse_label
+
+        ingested = {(source['path'], source['size'], source['mtime']) for source in self.metadata['sources']}
+        fields = {'text_field': text_field, 'label_field': label_field, 'id_field': id_field}
+        added = 0
+        for shard in expand_sources(sources):
+            signature = _source_signature(shard)
+            if (signature['path'], signature['size'], signature['mtime']) in ingested:
+                continue
+
+            name = os.path.basename(shard)
+            records = (
+                (_json_id(record_id, f"{name}:{row}"), text, parse_label(label))
+                for row, (text, label, record_id) in enumerate(
+                    iter_rows(shard, (text_field, label_field, id_field)), 1
+                )
+            )
+            added += self.append(records, source=dict(signature, **fields))
+        return added
+
+    def rebuild(self, tokenizer_json):
+        """Recria o store com outro vocabulário, relendo os shards registrados; retorna o novo store"""
+        sources = self.metadata['sources']
+        missing = [source['path'] for source in sources if not os.path.isfile(source['path'])]
+        if missing:
+            raise ValueError(f"Não é possível reconstruir o store, arquivos ausentes: {', '.join(missing)}")
+
+        # Constrói ao lado e troca no final, como em `AITextDetectorML.save`
+        tmp_path = self.path.rstrip(os.sep) + '.tmp'
+        store = CorpusStore.create(tmp_path, tokenizer_json)
+        for source in sources:
+            store.ingest([source['path']], source['text_field'], source['label_field'], source['id_field'])
+
+        shutil.rmtree(self.path)
+        os.replace(tmp_path, self.path)
+        return CorpusStore(self.path)
+
+    def ensure_vocabulary(self, tokenizer_json):
+        """Retorna um store com os ids do vocabulário de `tokenizer_json`, reconstruindo se estiver obsoleto"""
+        if FastTokenizer.from_json(tokenizer_json, 1).vocabulary_version == self.vocabulary_version:
+            return self
+        print(f"Vocabulário do store {self.path} está desatualizado; reconstruindo...")
+        return self.rebuild(tokenizer_json)
+
+    def stats(self):
+        labels = np.asarray(self.labels)
+        return {
+            'documents': len(self),
+            'tokens': self.metadata['tokens'],
+            'labeled': int((labels != UNLABELED).sum()),
+            'skipped': self.metadata['skipped'],
+            'sources': len(self.metadata['sources']),
+            'vocabulary_version': self.vocabulary_version,
+        }
+
+
+def score_store(detector, store, batch_size, offset=0):
+    """Pontua os documentos de um store e gera {'offset', 'id', 'ai_probability'} por documento
+
+    Lê os ids já tokenizados direto do mapeamento, sem texto nem tokenização;
+    o store precisa ter o vocabulário do modelo (ver `ensure_vocabulary`).
+    Como em `analyze_texts`, textos com menos de `MIN_TEXT_LENGTH` caracteres
+    recebem 0 sem passar pelo modelo.
+    """
+    from main import MIN_TEXT_LENGTH
+
+    if store.vocabulary_version != detector.fast_tokenizer.vocabulary_version:
+        raise ValueError("O store foi gerado com outro vocabulário; reconstrua-o antes de pontuar")
+
+    ids = store.ids
+    for first, padded in store.iter_padded(detector.max_len, batch_size, offset):
+        indices = np.arange(first, first + len(padded))
+        scorable = np.flatnonzero(store.chars[indices] >= MIN_TEXT_LENGTH)
+        scores = np.zeros(len(padded), dtype=np.float32)
+        if len(scorable):
+            scores[scorable] = detector._predict_padded(padded[scorable]) * 100
+        for index, score in zip(indices, scores):
+            yield {'offset': int(index), 'id': ids[index], 'ai_probability': round(float(score), 4)}
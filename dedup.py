@@ -0,0 +1,245 @@
+import os
+import json
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from main import MIN_TEXT_LENGTH, WORD_PATTERN
+
+
+DEDUP_FORMAT_VERSION = 1
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 128
+DEFAULT_SHINGLE_SIZE = 3
+DEFAULT_MAX_ENTRIES = 50000
+
+# Primo logo abaixo de 2**32: os valores das permutações cabem em uint32
+MINHASH_PRIME = 4294967291
+
+# Probabilidade mínima de dois textos com similaridade igual ao limiar caírem no mesmo balde
+LSH_TARGET_RECALL = 0.98
+
+
+def lsh_params(num_perm, threshold):
+    """(bandas, linhas por banda) do LSH para `threshold`
+
+    Usa o maior número de linhas (menos candidatos falsos) com que dois
+    textos de similaridade `threshold` ainda colidem em alguma banda com
+    probabilidade >= `LSH_TARGET_RECALL`. Candidatos são confirmados pela
+    similaridade estimada, então colisões extras só custam tempo.
+    """
+    for rows in range(num_perm, 0, -1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= LSH_TARGET_RECALL:
+            return bands, rows
+    return num_perm, 1
+
+
+class NearDuplicateIndex:
+    """Índice MinHash + LSH de quase duplicatas para a pontuação em lote
+
+    Cada texto vira o conjunto de shingles de `shingle_size` palavras
+    (minúsculas, separadas como no tokenizer), resumido numa assinatura
+    MinHash de `num_perm` valores. As assinaturas são divididas em bandas
+    (ver `lsh_params`) e indexadas por balde; um texto novo só é comparado
+    com os que dividem algum balde com ele, e é quase duplicata quando a
+    similaridade de Jaccard estimada chega a `threshold`.
+
+    Cada entrada do índice é o representante de um cluster e guarda o
+    resultado da sua análise; quase duplicatas reaproveitam esse resultado
+    (inclusive partes suspeitas e relatório) sem passar pelo modelo. O
+    índice guarda no máximo `max_entries` representantes, descartando os
+    usados há mais tempo, e pode ser salvo e carregado com `save`/`load`.
+    Resultados valem para uma versão do modelo e um modo de análise (ver
+    `bind`).
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, shingle_size=DEFAULT_SHINGLE_SIZE,
+                 max_entries=DEFAULT_MAX_ENTRIES, seed=1):
+        if not 0 < threshold <= 1:
+            raise ValueError("O limiar de similaridade deve estar entre 0 e 1")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.max_entries = max_entries
+        self.seed = seed
+        self.bands, self.rows = lsh_params(num_perm, threshold)
+
+        # Permutações h(x) = (a·x + b) mod p; a < 2**31 evita estouro em uint64
+        random = np.random.RandomState(seed)
+        self._a = random.randint(1, 2 ** 31, size=(num_perm, 1)).astype(np.uint64)
+        self._b = random.randint(0, 2 ** 31, size=(num_perm, 1)).astype(np.uint64)
+
+        self.model_version = None
+        self.variant = None
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._next_key = 0
+
+        self.queries = 0
+        self.duplicates = 0
+        self.evictions = 0
+
+    def signature(self, text):
+        """Assinatura MinHash (uint32, `num_perm` valores) dos shingles de palavras do texto"""
+        words = WORD_PATTERN.findall(text.lower())
+        size = self.shingle_size
+        shingles = {' '.join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode('utf-8')) for shingle in shingles), dtype=np.uint64, count=len(shingles)
+        )
+        return ((self._a * hashes + self._b) % MINHASH_PRIME).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [hash((band, signature[band * rows:(band + 1) * rows].tobytes())) for band in range(self.bands)]
+
+    def bind(self, model_version, variant=''):
+        """Associa o índice a uma versão do modelo e modo de análise, esvaziando-o se mudarem"""
+        if (model_version, variant) == (self.model_version, self.variant):
+            return
+        self.model_version = model_version
+        self.variant = variant
+        self.clear()
+
+    def clear(self):
+        self._entries.clear()
+        self._buckets.clear()
+
+    def query(self, signature):
+        """Retorna (entrada, similaridade) do representante mais parecido acima do limiar, ou None"""
+        self.queries += 1
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+
+        best = None
+        for key in candidates:
+            entry = self._entries[key]
+            similarity = float(np.count_nonzero(entry['signature'] == signature)) / self.num_perm
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (entry, similarity)
+
+        if best is not None:
+            self._entries.move_to_end(best[0]['key'])
+        return best
+
+    def add(self, signature, record_id, result=None):
+        """Registra um novo representante de cluster e retorna a sua entrada"""
+        key = self._next_key
+        self._next_key += 1
+        entry = {'key': key, 'signature': signature, 'id': record_id, 'result': result, 'size': 1}
+        self._entries[key] = entry
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(key)
+
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            for band_key in self._band_keys(evicted['signature']):
+                bucket = self._buckets[band_key]
+                bucket.remove(evicted['key'])
+                if not bucket:
+                    del self._buckets[band_key]
+            self.evictions += 1
+        return entry
+
+    def analyze(self, texts, ids, compute):
+        """Resultados de `compute` para `texts`, calculados só para os representantes de clusters
+
+        Retorna (resultados, clusters): para cada texto, o resultado da sua
+        análise (ou a do representante) e um dicionário com o cluster, a ser
+        incluído na saída. Textos curtos demais não entram no índice.
+        """
+        assignments = []
+        fresh = []
+        for text, record_id in zip(texts, ids):
+            if len(text.strip()) < MIN_TEXT_LENGTH:
+                assignments.append((None, None))
+                fresh.append((None, text))
+                continue
+
+            signature = self.signature(text)
+            match = self.query(signature)
+            if match is not None:
+                entry, similarity = match
+                entry['size'] += 1
+                self.duplicates += 1
+                assignments.append((entry, similarity))
+            else:
+                entry = self.add(signature, record_id)
+                assignments.append((entry, None))
+                fresh.append((entry, text))
+
+        computed = compute([text for _, text in fresh])
+        own_results = iter(computed)
+        for entry, _ in fresh:
+            result = next(own_results)
+            if entry is not None:
+                entry['result'] = result
+
+        results = []
+        clusters = []
+        own_results = iter(computed)
+        for entry, similarity in assignments:
+            if entry is None:
+                results.append(next(own_results))
+                clusters.append(None)
+            elif similarity is None:
+                results.append(next(own_results))
+                clusters.append({'cluster': entry['id']})
+            else:
+                results.append(entry['result'])
+                clusters.append({'cluster': entry['id'], 'near_duplicate': True, 'similarity': round(similarity, 3)})
+        return results, clusters
+
+    def save(self, path):
+        """Grava assinaturas, representantes e resultados num `.npz` (troca atômica do arquivo)"""
+        entries = list(self._entries.values())
+        metadata = {
+            'format_version': DEDUP_FORMAT_VERSION,
+            'num_perm': self.num_perm,
+            'shingle_size': self.shingle_size,
+            'seed': self.seed,
+            'model_version': self.model_version,
+            'variant': self.variant,
+            'entries': [{'id': entry['id'], 'result': entry['result'], 'size': entry['size']} for entry in entries],
+        }
+        signatures = np.stack([entry['signature'] for entry in entries]) if entries else \
+            np.zeros((0, self.num_perm), dtype=np.uint32)
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            np.savez(file, signatures=signatures, metadata=np.array(json.dumps(metadata, ensure_ascii=False)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, threshold=DEFAULT_THRESHOLD, max_entries=DEFAULT_MAX_ENTRIES):
+        """Carrega um índice salvo com `save`; o limiar pode mudar entre execuções (os baldes são recriados)"""
+        with np.load(path, allow_pickle=False) as data:
+            metadata = json.loads(str(data['metadata']))
+            signatures = data['signatures']
+        if metadata.get('format_version') != DEDUP_FORMAT_VERSION:
+            raise ValueError(f"Formato de índice de duplicatas não suportado: {path}")
+
+        index = cls(threshold, metadata['num_perm'], metadata['shingle_size'], max_entries, metadata['seed'])
+        index.model_version = metadata['model_version']
+        index.variant = metadata['variant']
+        for signature, saved in zip(signatures, metadata['entries']):
+            result = tuple(saved['result']) if saved['result'] is not None else None
+            index.add(signature, saved['id'], result)['size'] = saved['size']
+        index.evictions = 0
+        return index
+
+    def stats(self):
+        sizes = [entry['size'] for entry in self._entries.values()]
+        return {
+            'entries': len(sizes),
+            'clusters_with_duplicates': sum(1 for size in sizes if size > 1),
+            'queries': self.queries,
+            'duplicates': self.duplicates,
+            'evictions': self.evictions,
+            'bands': self.bands,
+            'rows': self.rows,
+        }
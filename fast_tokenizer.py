@@ -0,0 +1,125 @@
+import re
+import json
+import hashlib
+
+import numpy as np
+
+
+# Filtros padrão do Tokenizer do Keras
+DEFAULT_FILTERS = '!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n'
+
+
+class FastTokenizer:
+    """Tokenizer pré-compilado que escreve ids diretamente em matrizes int32
+
+    Reproduz `Tokenizer.texts_to_sequences` + `pad_sequences(padding='post',
+    truncating='post')` do Keras para um vocabulário já ajustado: minúsculas,
+    separação pelos filtros (uma regex compilada), palavras com índice
+    >= `num_words` ou fora do vocabulário viram o token OOV. Os ids são
+    gravados num buffer reutilizado (ou fornecido por quem chama), sem listas
+    intermediárias por lote nem a cópia extra do `pad_sequences`.
+
+    O buffer interno é reutilizado entre chamadas, então a instância não deve
+    ser compartilhada entre threads que codificam ao mesmo tempo.
+    """
+
+    def __init__(self, word_index, num_words, max_len, oov_token='<OOV>', filters=DEFAULT_FILTERS, lower=True):
+        self.num_words = num_words
+        self.max_len = max_len
+        self.lower = lower
+        self.oov_index = word_index.get(oov_token) if oov_token is not None else None
+        self.vocabulary = {
+            word: index for word, index in word_index.items()
+            if not num_words or index < num_words
+        }
+        # Equivalente a trocar os filtros por espaço e separar por ' ', descartando vazios
+        self.pattern = re.compile('[^ ' + re.escape(filters) + ']+')
+        self._buffer = np.zeros((0, max_len), dtype=np.int32)
+        self._vocabulary_version = None
+
+    @classmethod
+    def from_keras(cls, tokenizer, max_len):
+        """Cria a partir de um `keras.preprocessing.text.Tokenizer` já ajustado"""
+        return cls(
+            tokenizer.word_index,
+            tokenizer.num_words,
+            max_len,
+            oov_token=tokenizer.oov_token,
+            filters=tokenizer.filters,
+            lower=tokenizer.lower
+        )
+
+    @classmethod
+    def from_json(cls, tokenizer_json, max_len):
+        """Cria a partir do JSON gerado por `Tokenizer.to_json()`, sem importar o Keras"""
+        config = json.loads(tokenizer_json)['config']
+        word_index = config['word_index']
+        if isinstance(word_index, str):
+            word_index = json.loads(word_index)
+        return cls(
+            word_index,
+            config.get('num_words'),
+            max_len,
+            oov_token=config.get('oov_token'),
+            filters=config.get('filters', DEFAULT_FILTERS),
+            lower=config.get('lower', True)
+        )
+
+    @property
+    def vocabulary_version(self):
+        """Hash do vocabulário e das regras de separação: muda sempre que os ids gerados mudariam"""
+        if self._vocabulary_version is None:
+            payload = json.dumps(
+                [sorted(self.vocabulary.items()), self.oov_index, self.pattern.pattern, self.lower],
+                ensure_ascii=False
+            ).encode('utf-8')
+            self._vocabulary_version = hashlib.sha256(payload).hexdigest()[:16]
+        return self._vocabulary_version
+
+    def _ids(self, text, limit=None):
+        if self.lower:
+            text = text.lower()
+        words = self.pattern.findall(text)
+        if limit is not None:
+            words = words[:limit]
+
+        get = self.vocabulary.get
+        if self.oov_index is None:
+            return [index for index in map(get, words) if index is not None]
+        oov = self.oov_index
+        return [get(word, oov) for word in words]
+
+    def texts_to_sequences(self, texts):
+        """Listas de ids completas (sem truncar), como `Tokenizer.texts_to_sequences`"""
+        return [self._ids(text) for text in texts]
+
+    def _output(self, rows, out):
+        if out is None:
+            if self._buffer.shape[0] < rows:
+                self._buffer = np.zeros((max(rows, 2 * self._buffer.shape[0]), self.max_len), dtype=np.int32)
+            out = self._buffer
+        elif out.shape[0] < rows or out.shape[1] != self.max_len or out.dtype != np.int32:
+            raise ValueError(f"Buffer deve ser int32 com pelo menos {rows} linhas e {self.max_len} colunas")
+
+        view = out[:rows]
+        view.fill(0)
+        return view
+
+    def encode(self, texts, out=None):
+        """Tokeniza `texts` numa matriz int32 (len(texts) x max_len) com padding/truncamento 'post'
+
+        Retorna uma view de `out` (ou do buffer interno, válida até a próxima chamada).
+        """
+        view = self._output(len(texts), out)
+        for row, text in enumerate(texts):
+            ids = self._ids(text, self.max_len)
+            view[row, :len(ids)] = ids
+        return view
+
+    def pad(self, sequences, out=None):
+        """Aplica padding/truncamento 'post' a sequências já tokenizadas, no mesmo buffer"""
+        view = self._output(len(sequences), out)
+        for row, ids in enumerate(sequences):
+            ids = ids[:self.max_len]
+            view[row, :len(ids)] = ids
+        return view
@@ -0,0 +1,129 @@
+import re
+
+from cache import ResultCache
+from main import MIN_TEXT_LENGTH, TextStats
+
+
+# Parágrafos são separados por uma ou mais linhas em branco
+BLANK_LINE_PATTERN = re.compile(r'\n[ \t\r\f\v]*\n')
+
+DEFAULT_MAX_PARAGRAPHS = 2048
+
+
+def split_paragraphs(text):
+    """Lista de (offset, parágrafo) do texto, sem espaços nas pontas de cada parágrafo"""
+    paragraphs = []
+    start = 0
+    for end in [match.start() for match in BLANK_LINE_PATTERN.finditer(text)] + [len(text)]:
+        chunk = text[start:end]
+        stripped = chunk.lstrip()
+        if stripped:
+            paragraphs.append((start + len(chunk) - len(stripped), stripped.rstrip()))
+        start = end
+    return paragraphs
+
+
+class IncrementalAnalyzer:
+    """Reanalisa um documento em edição pontuando apenas os parágrafos alterados
+
+    Cada parágrafo tem score do modelo, número de tokens e `TextStats` guardados
+    num `ResultCache` em memória, com chave pelo conteúdo do parágrafo (e pela
+    versão do modelo). A cada chamada de `analyze`, só os parágrafos ausentes
+    do cache passam pelo modelo, todos numa única passagem. O resultado do
+    documento é remontado a partir das partes: o score é a média dos scores dos
+    parágrafos ponderada pelo número de tokens, e heurísticas e relatório usam
+    as estatísticas dos parágrafos combinadas com `TextStats.combine`.
+
+    Parágrafos longos são pontuados por janelas, como em `analyze_texts_chunked`.
+    Parágrafos com menos de `MIN_TEXT_LENGTH` caracteres entram nas
+    estatísticas, mas não no score.
+    """
+
+    def __init__(self, detector, max_paragraphs=DEFAULT_MAX_PARAGRAPHS):
+        self.detector = detector
+        self.cache = ResultCache(max_paragraphs)
+        self.last_paragraphs = 0
+        self.last_rescored = 0
+
+    def _key(self, paragraph):
+        return self.cache.make_key(paragraph, self.detector.model_version, 'paragraph', normalize=False)
+
+    def _score_paragraphs(self, paragraphs):
+        """Score (0-100) e número de tokens de cada parágrafo, numa única passagem pelo modelo"""
+        detector = self.detector
+        stride = max(detector.max_len // 2, 1)
+        windows_per_text, padded = detector._split_windows(paragraphs, stride)
+        scores = detector._predict_padded(padded) if len(padded) else []
+
+        results = []
+        position = 0
+        for windows in windows_per_text:
+            for window in windows:
+                window['score'] = float(scores[position]) * 100
+                position += 1
+            results.append((detector._aggregate_windows(windows, 'weighted'), windows[-1]['token_end']))
+        return results
+
+    def analyze(self, text):
+        """Retorna (probabilidade, partes_suspeitas, relatório) do documento, como `analyze_text`"""
+        detector = self.detector
+        self.cache.bind_model(detector.model_version)
+
+        paragraphs = split_paragraphs(text)
+        keys = [self._key(paragraph) for _, paragraph in paragraphs]
+        entries = [self.cache.get(key) for key in keys]
+
+        missing = {}
+        for key, (_, paragraph), entry in zip(keys, paragraphs, entries):
+            if entry is None:
+                missing.setdefault(key, paragraph)
+
+        if missing:
+            scorable = [paragraph for paragraph in missing.values() if len(paragraph) >= MIN_TEXT_LENGTH]
+            scored = dict(zip(scorable, self._score_paragraphs(scorable))) if scorable else {}
+            computed = {}
+            for key, paragraph in missing.items():
+                score, tokens = scored.get(paragraph, (None, 0))
+                computed[key] = (score, tokens, detector._text_stats(paragraph))
+            self.cache.put_many(computed.items())
+            entries = [computed[key] if entry is None else entry for key, entry in zip(keys, entries)]
+
+        self.last_paragraphs = len(paragraphs)
+        self.last_rescored = len(missing)
+
+        weighted = [(score, max(tokens, 1)) for score, tokens, _ in entries if score is not None]
+        if not weighted:
+            return 0, [], "Texto muito curto para análise"
+
+        ai_probability = sum(score * weight for score, weight in weighted) / sum(weight for _, weight in weighted)
+
+        with detector._stage('heuristics'):
+            stats = TextStats.combine(
+                [(offset, entry[2]) for (offset, _), entry in zip(paragraphs, entries)],
+                text,
+                detector.connector_matcher
+            )
+            suspicious_parts = detector._identify_suspicious_parts(text, stats)
+
+        with detector._stage('report'):
+            report = detector._generate_report(ai_probability, text, stats)
+            report += self._paragraph_report(paragraphs, entries)
+
+        return ai_probability, suspicious_parts, report
+
+    def _paragraph_report(self, paragraphs, entries):
+        """Seção do relatório com o score de cada parágrafo pontuado"""
+        report = (
+            f"\nAnálise por parágrafos ({len(paragraphs)} parágrafos, "
+            f"{self.last_rescored} reanalisados nesta edição):\n"
+        )
+        for i, ((_, paragraph), (score, _, _)) in enumerate(zip(paragraphs, entries), 1):
+            if score is None:
+                continue
+            marker = " ⚠" if score >= 70 else ""
+            snippet = ' '.join(paragraph.split()[:8])
+            report += f'• Parágrafo {i}: {score:.1f}%{marker} "{snippet}..."\n'
+        return report
+
+    def stats(self):
+        return dict(self.cache.stats(), paragraphs=self.last_paragraphs, rescored=self.last_rescored)
@@ -1,30 +1,542 @@
-import tkinter as tk
-from tkinter import ttk, filedialog, scrolledtext
+try:
+    import tkinter as tk
+    from tkinter import ttk, filedialog, scrolledtext
+except ImportError:
+    # Servidores sem Tk: apenas o modo de linha de comando fica disponível
+    tk = None
 import numpy as np
-import tensorflow as tf
-from tensorflow import keras
-from tensorflow.keras import layers
 import re
+import os
+import sys
+import json
+import queue
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from cache import ResultCache
+from metrics import Instrumentation, HistogramAggregator
+from fast_tokenizer import FastTokenizer
+from numpy_engine import NumpyBiLSTM, extract_weights, export_weights
+from itertools import islice, repeat
+import time
+import hashlib
+import shutil
+from functools import cached_property
 from collections import Counter
 import warnings
 warnings.filterwarnings('ignore')
 
+# Versão do formato do artefato em disco; incrementar ao mudar o layout
+ARTIFACT_VERSION = 2
+DEFAULT_ARTIFACT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model_artifact')
+# Estágio linear da cascata (cascade.py), independente do artefato da BiLSTM
+DEFAULT_CASCADE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cascade_model.npz')
+
+MODEL_FILE = 'model.keras'
+TOKENIZER_FILE = 'tokenizer.json'
+METADATA_FILE = 'metadata.json'
+WEIGHTS_FILE = 'weights.npz'
+
+# Motores de inferência: 'numpy' dispensa o TensorFlow (importado só para treinar);
+# 'tensorflow' carrega o modelo Keras
+ENGINES = ('numpy', 'tensorflow')
+
+# Contexto vazio usado no lugar da medição de etapas quando não há instrumentação
+NULL_STAGE = contextlib.nullcontext()
+
+# Intervalo com que a interface verifica resultados do worker
+POLL_INTERVAL_MS = 50
+
+# Pausa na digitação após a qual a análise ao vivo é disparada
+LIVE_DEBOUNCE_MS = 400
+
+# Textos com menos caracteres que isso não são analisados
+MIN_TEXT_LENGTH = 20
+DEFAULT_BATCH_SIZE = 64
+
+# Comprimentos (em tokens) dos grupos da inferência por comprimento; max_len é sempre o último
+DEFAULT_LENGTH_BUCKETS = (32, 64, 128)
+
+# Separação de palavras equivalente à do Tokenizer do Keras (filtros padrão + espaço),
+# usada para mapear janelas de tokens de volta a offsets de caracteres
+WORD_PATTERN = re.compile(r'[^ !"#$%&()*+,\-./:;<=>?@\[\\\]^_`{|}~\t\n]+')
+WINDOW_AGGREGATIONS = ('mean', 'max', 'weighted')
+
+# Título da seção de resultado do relatório conforme o estágio da cascata (cascade.py) que decidiu o texto
+REPORT_RESULT_TITLES = {
+    None: "Resultado do modelo neural",
+    'linear': "Resultado do estágio linear da cascata (rápido)",
+    'bilstm': "Resultado do modelo neural (escalado pela cascata)",
+}
+
+# Conectivos formais típicos de IA
+AI_CONNECTORS = [
+    'além disso', 'portanto', 'no entanto', 'consequentemente',
+    'é importante notar', 'vale ressaltar', 'cabe destacar',
+    'neste contexto', 'dessa forma', 'assim sendo',
+    'furthermore', 'moreover', 'however', 'therefore',
+    'additionally', 'consequently'
+]
+
+
+class PhraseMatcher:
+    """Localiza todas as ocorrências de uma lista de frases numa única passagem pelo texto
+    
+    As frases são compiladas uma vez numa alternância com limites de palavra
+    (as mais longas primeiro), então 'however' não casa dentro de 'howeverish'
+    e frases com várias palavras aceitam qualquer espaço em branco entre elas.
+    """
+    
+    def __init__(self, phrases):
+        self.phrases = list(dict.fromkeys(' '.join(phrase.lower().split()) for phrase in phrases))
+        alternation = '|'.join(
+            r'\s+'.join(re.escape(word) for word in phrase.split())
+            for phrase in sorted(self.phrases, key=len, reverse=True)
+        )
+        self.pattern = re.compile(rf'(?<!\w)(?:{alternation})(?!\w)', re.IGNORECASE)
+    
+    def find(self, text):
+        """Retorna {frase: [(início, fim), ...]} com os offsets de caracteres de cada ocorrência
+        
+        As frases aparecem na ordem da lista original.
+        """
+        matches = {}
+        for match in self.pattern.finditer(text):
+            phrase = ' '.join(match.group().lower().split())
+            matches.setdefault(phrase, []).append(match.span())
+        
+        return {phrase: matches[phrase] for phrase in self.phrases if phrase in matches}
+    
+    def count(self, text):
+        """Retorna {frase: número de ocorrências}"""
+        return {phrase: len(spans) for phrase, spans in self.find(text).items()}
+
+
+SENTENCE_ENDINGS = '.!?'
+SENTENCE_PATTERN = re.compile(f'[^{re.escape(SENTENCE_ENDINGS)}]+')
+WORD_SPLIT_PATTERN = re.compile(r'\S+')
+
+
+class TextStats:
+    """Estatísticas de um texto calculadas uma única vez e compartilhadas por heurísticas e relatório
+    
+    Sentenças, palavras por sentença, comprimentos (como array NumPy) e
+    primeiras palavras são calculados na construção; o restante é calculado
+    sob demanda e guardado. Novas características estilométricas podem ser
+    registradas com `TextStats.register_feature` e lidas com `stats.feature(nome)`
+    sem percorrer o texto de novo.
+    """
+    
+    _feature_functions = {}
+    
+    def __init__(self, text, connector_matcher=None):
+        self.text = text
+        self.connector_matcher = connector_matcher
+        self.sentences = [s.strip() for s in SENTENCE_PATTERN.findall(text) if s.strip()]
+        self.sentence_words = [sentence.split() for sentence in self.sentences]
+        self.sentence_lengths = np.array([len(words) for words in self.sentence_words], dtype=np.int32)
+        self.sentence_starts = [words[0].lower() if words else '' for words in self.sentence_words]
+        self._features = {}
+    
+    @classmethod
+    def combine(cls, parts, text, connector_matcher=None):
+        """Junta as estatísticas de trechos de `text` sem percorrê-lo de novo
+        
+        `parts` é uma lista de (offset, TextStats) na ordem do texto; offsets
+        de palavras e conectivos são deslocados para o texto completo. Como em
+        `SENTENCE_PATTERN`, um trecho que não termina com pontuação (um título,
+        por exemplo) continua na primeira sentença do trecho seguinte, então o
+        resultado é igual ao de `TextStats(text)`.
+        """
+        stats = cls.__new__(cls)
+        stats.text = text
+        stats.connector_matcher = connector_matcher
+        stats.sentences = []
+        stats.sentence_words = []
+        stats.sentence_starts = []
+        open_end = None  # fim, no texto completo, da última sentença se ela ficou sem pontuação
+        for offset, part in parts:
+            content = part.text.strip()
+            if not content:
+                continue
+            sentences, sentence_words, sentence_starts = part.sentences, part.sentence_words, part.sentence_starts
+            if open_end is not None and content[0] not in SENTENCE_ENDINGS:
+                start = offset + len(part.text) - len(part.text.lstrip())
+                stats.sentences[-1] += text[open_end:start] + sentences[0]
+                stats.sentence_words[-1] = stats.sentence_words[-1] + sentence_words[0]
+                sentences, sentence_words, sentence_starts = sentences[1:], sentence_words[1:], sentence_starts[1:]
+            stats.sentences.extend(sentences)
+            stats.sentence_words.extend(sentence_words)
+            stats.sentence_starts.extend(sentence_starts)
+            open_end = offset + len(part.text.rstrip()) if content[-1] not in SENTENCE_ENDINGS else None
+        stats.sentence_lengths = np.array([len(words) for words in stats.sentence_words], dtype=np.int32)
+        stats._features = {}
+        
+        stats.word_spans = [
+            (start + offset, end + offset) for offset, part in parts for start, end in part.word_spans
+        ]
+        connector_spans = {}
+        for offset, part in parts:
+            for connector, spans in part.connector_spans.items():
+                connector_spans.setdefault(connector, []).extend(
+                    (start + offset, end + offset) for start, end in spans
+                )
+        if connector_matcher is not None:
+            connector_spans = {
+                phrase: connector_spans[phrase] for phrase in connector_matcher.phrases if phrase in connector_spans
+            }
+        stats.connector_spans = connector_spans
+        return stats
+    
+    @classmethod
+    def register_feature(cls, name):
+        """Decorador que registra uma característica calculada a partir de um `TextStats`"""
+        def decorator(function):
+            cls._feature_functions[name] = function
+            return function
+        return decorator
+    
+    def feature(self, name):
+        """Retorna (calculando uma única vez) a característica registrada com `name`"""
+        if name not in self._features:
+            self._features[name] = self._feature_functions[name](self)
+        return self._features[name]
+    
+    @property
+    def sentence_count(self):
+        return len(self.sentences)
+    
+    @cached_property
+    def word_spans(self):
+        """Offsets (início, fim) de cada palavra separada por espaço em branco"""
+        return [match.span() for match in WORD_SPLIT_PATTERN.finditer(self.text)]
+    
+    @property
+    def word_count(self):
+        return len(self.word_spans)
+    
+    @cached_property
+    def connector_spans(self):
+        """{conectivo: [(início, fim), ...]} segundo o `connector_matcher`"""
+        if self.connector_matcher is None:
+            return {}
+        return self.connector_matcher.find(self.text)
+    
+    @cached_property
+    def connector_counts(self):
+        return {connector: len(spans) for connector, spans in self.connector_spans.items()}
+
+
+@TextStats.register_feature('sentence_length_mean')
+def _sentence_length_mean(stats):
+    return float(stats.sentence_lengths.mean()) if stats.sentence_count else 0.0
+
+
+@TextStats.register_feature('sentence_length_std')
+def _sentence_length_std(stats):
+    return float(stats.sentence_lengths.std()) if stats.sentence_count else 0.0
+
+
+@TextStats.register_feature('most_common_start')
+def _most_common_start(stats):
+    """(palavra, número de sentenças) da primeira palavra mais repetida"""
+    if not stats.sentence_count:
+        return '', 0
+    return Counter(stats.sentence_starts).most_common(1)[0]
+
+
 class AITextDetectorML:
-    def __init__(self):
+    def __init__(self, artifact_dir=DEFAULT_ARTIFACT_DIR, retrain=False, use_compiled=True,
+                 progress_callback=None, cache=None, instrumentation=None, engine='numpy',
+                 length_buckets=DEFAULT_LENGTH_BUCKETS, trainer=None, cascade=None):
+        if engine not in ENGINES:
+            raise ValueError(f"Motor inválido: {engine} (use {', '.join(ENGINES)})")
+        
         self.max_words = 5000
         self.max_len = 200
+        self.embedding_dim = 128
+        self.lstm_units = 64
+        self.epochs = 10
+        # Padding (id 0) mascarado na Embedding: o score não depende de quanto padding há
+        self.mask_padding = True
         self.model = None
         self.tokenizer = None
-        self._build_and_train_model()
+        self.fast_tokenizer = None
+        self.model_version = None
+        self.artifact_dir = artifact_dir
+        self.config_hash = self._config_hash()
+        self.connector_matcher = PhraseMatcher(AI_CONNECTORS)
+        
+        # Motor de inferência (ver ENGINES); com 'numpy', o modelo Keras só existe após um treino
+        self.engine = engine
+        self._numpy_model = None
+        
+        # Textos curtos rodam no menor comprimento de `length_buckets` que os comporte,
+        # em vez de sempre max_len; vazio ou None desativa
+        self.length_buckets = tuple(sorted(set(length_buckets or ())))
+        
+        # Caminho de inferência compilado (tf.function); False usa model.predict, para comparação
+        self.use_compiled = use_compiled
+        self._infer = None
+        
+        # Chamado com (fração concluída, mensagem) durante carregamento e treino
+        self.progress_callback = progress_callback
+        
+        # ResultCache opcional consultado por analyze_text(s) e pelo modo por janelas
+        self.cache = cache
+        
+        # Instrumentation opcional (metrics.py) que recebe o tempo de cada etapa
+        self.instrumentation = instrumentation
+        self._epoch_started = 0.0
+        self._fit_epochs = self.epochs
+        
+        # Treino a partir de um corpus rotulado (training.StreamingTrainer); None usa os dados sintéticos
+        self.trainer = trainer
+        # Descrição dos dados de treino gravada nos metadados do artefato, se houver
+        self.training_info = None
+        
+        # cascade.Cascade opcional: um estágio linear decide os textos claros e só os incertos vão à BiLSTM
+        self.cascade = cascade
+        
+        # Carrega o artefato salvo quando compatível; treina apenas se faltar ou estiver desatualizado
+        if artifact_dir and not retrain and self.is_artifact_compatible(artifact_dir):
+            self.load(artifact_dir)
+        else:
+            self._build_and_train_model()
+            if artifact_dir:
+                self.save(artifact_dir)
+    
+    def _config_hash(self):
+        """Hash da configuração que determina a compatibilidade do artefato"""
+        config = {
+            'artifact_version': ARTIFACT_VERSION,
+            'max_words': self.max_words,
+            'max_len': self.max_len,
+            'embedding_dim': self.embedding_dim,
+            'lstm_units': self.lstm_units,
+            'mask_padding': self.mask_padding,
+            'epochs': self.epochs,
+        }
+        payload = json.dumps(config, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()[:16]
+    
+    def is_artifact_compatible(self, path):
+        """Verifica se existe um artefato completo e compatível em `path`"""
+        metadata_path = os.path.join(path, METADATA_FILE)
+        if not os.path.isfile(metadata_path):
+            return False
+        
+        try:
+            with open(metadata_path, 'r', encoding='utf-8') as file:
+                metadata = json.load(file)
+        except (OSError, ValueError):
+            return False
+        
+        if metadata.get('config_hash') != self.config_hash:
+            return False
+        
+        return all(
+            os.path.isfile(os.path.join(path, name))
+            for name in (MODEL_FILE, TOKENIZER_FILE, WEIGHTS_FILE)
+        )
+    
+    def _is_artifact_dir(self, path):
+        """Diretório que `save()` pode substituir: um artefato (com metadados) ou só arquivos de artefato"""
+        if not os.path.isdir(path):
+            return False
+        if self.is_artifact_compatible(path) or os.path.isfile(os.path.join(path, METADATA_FILE)):
+            return True
+        # Vazio ou restos de um `save()` interrompido
+        return set(os.listdir(path)) <= {MODEL_FILE, TOKENIZER_FILE, WEIGHTS_FILE, METADATA_FILE}
+    
+    def save(self, path=None):
+        """Salva modelo, pesos para o motor NumPy, vocabulário do tokenizer e metadados em `path`
+        
+        Sem modelo Keras em memória (motor 'numpy'), copia os arquivos do artefato de onde o
+        modelo foi carregado (`artifact_dir`).
+        """
+        path = path or self.artifact_dir
+        if not path:
+            raise ValueError("Nenhum diretório de artefato informado")
+        source = self.artifact_dir
+        if self.model is None and not (source and self.is_artifact_compatible(source)):
+            raise ValueError("Não há modelo Keras em memória nem artefato de origem para copiar")
+        
+        # Escreve num diretório temporário e troca no final para não deixar artefatos parciais
+        tmp_path = path.rstrip(os.sep) + '.tmp'
+        for existing in (path, tmp_path):
+            if os.path.exists(existing) and not self._is_artifact_dir(existing):
+                raise ValueError(f"{existing} já existe e não é um artefato do modelo; não será substituído")
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+        
+        if self.model is None:
+            for name in (MODEL_FILE, TOKENIZER_FILE, WEIGHTS_FILE, METADATA_FILE):
+                shutil.copy2(os.path.join(source, name), os.path.join(tmp_path, name))
+        else:
+            self._write_artifact(tmp_path)
+        
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+        self.artifact_dir = path
+    
+    def _write_artifact(self, tmp_path):
+        import tensorflow as tf
+        
+        self.model.save(os.path.join(tmp_path, MODEL_FILE))
+        export_weights(self.model, os.path.join(tmp_path, WEIGHTS_FILE))
+        
+        with open(os.path.join(tmp_path, TOKENIZER_FILE), 'w', encoding='utf-8') as file:
+            file.write(self.tokenizer.to_json())
+        
+        metadata = {
+            'artifact_version': ARTIFACT_VERSION,
+            'config_hash': self.config_hash,
+            'model_version': self.model_version,
+            'max_words': self.max_words,
+            'max_len': self.max_len,
+            'tensorflow_version': tf.__version__,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        if self.training_info is not None:
+            metadata['training'] = self.training_info
+        with open(os.path.join(tmp_path, METADATA_FILE), 'w', encoding='utf-8') as file:
+            json.dump(metadata, file, indent=2)
+    
+    def load(self, path=None):
+        """Carrega modelo e tokenizer de um artefato salvo com `save()`
+        
+        Com o motor 'numpy', lê apenas os pesos e o vocabulário, sem importar o TensorFlow.
+        """
+        path = path or self.artifact_dir
+        if not path or not self.is_artifact_compatible(path):
+            raise ValueError(f"Artefato ausente ou incompatível em: {path}")
+        
+        self._report_progress(0.0, "Carregando artefato do modelo...")
+        with open(os.path.join(path, METADATA_FILE), 'r', encoding='utf-8') as file:
+            metadata = json.load(file)
+        
+        with open(os.path.join(path, TOKENIZER_FILE), 'r', encoding='utf-8') as file:
+            tokenizer_json = file.read()
+        
+        self.max_words = metadata['max_words']
+        self.max_len = metadata['max_len']
+        self.model_version = metadata['model_version']
+        self.artifact_dir = path
+        self.fast_tokenizer = FastTokenizer.from_json(tokenizer_json, self.max_len)
+        
+        if self.engine == 'numpy':
+            self._numpy_model = NumpyBiLSTM.load(os.path.join(path, WEIGHTS_FILE))
+        else:
+            from tensorflow import keras
+            
+            self.tokenizer = keras.preprocessing.text.tokenizer_from_json(tokenizer_json)
+            self.model = keras.models.load_model(os.path.join(path, MODEL_FILE))
+            self._report_progress(0.9, "Preparando inferência...")
+            self._compile_inference()
+        if self.cache is not None:
+            self.cache.bind_model(self.model_version)
+        self._report_progress(1.0, "Modelo carregado")
+        print(f"Modelo carregado de {path}")
+    
+    def _stage(self, name, count=1):
+        """Mede uma etapa se houver instrumentação; senão, um contexto vazio quase sem custo"""
+        if self.instrumentation is None:
+            return NULL_STAGE
+        return self.instrumentation.stage(name, count)
+    
+    def _record_value(self, name, value):
+        if self.instrumentation is not None:
+            self.instrumentation.record_value(name, value)
+    
+    def _report_progress(self, fraction, message):
+        """Repassa o progresso de carregamento/treino ao `progress_callback`, se houver"""
+        if self.progress_callback is not None:
+            self.progress_callback(fraction, message)
+    
+    def _compile_inference(self):
+        """Traça a função de inferência uma única vez e faz o aquecimento
+        
+        A assinatura (lote e comprimento variáveis, int32) serve a todos os
+        grupos de comprimento sem novos traçados, e a chamada de aquecimento
+        tira o custo do traçado da primeira análise.
+        """
+        import tensorflow as tf
+        
+        model = self.model
+        
+        @tf.function(input_signature=[tf.TensorSpec(shape=[None, None], dtype=tf.int32)])
+        def infer(inputs):
+            return model(inputs, training=False)
+        
+        infer(tf.zeros([1, self.max_len], dtype=tf.int32))
+        self._infer = infer
         
     def _build_and_train_model(self):
         print("Inicializando modelo TensorFlow...")
+        self._report_progress(0.0, "Preparando dados de treino...")
         
-        # Criar tokenizer
-        self.tokenizer = keras.preprocessing.text.Tokenizer(
+        if self.trainer is not None:
+            self.trainer.train(self)
+        else:
+            self._train_synthetic()
+        
+        # Identifica esta execução de treino (usado para invalidar resultados derivados do modelo)
+        self.model_version = hashlib.sha256(
+            f"{self.config_hash}:{time.time()}".encode('utf-8')
+        ).hexdigest()[:16]
+        
+        self._report_progress(0.9, "Preparando inferência...")
+        self.fast_tokenizer = FastTokenizer.from_keras(self.tokenizer, self.max_len)
+        if self.engine == 'numpy':
+            self._numpy_model = NumpyBiLSTM(extract_weights(self.model))
+        else:
+            self._compile_inference()
+        if self.cache is not None:
+            self.cache.bind_model(self.model_version)
+        self._report_progress(1.0, "Modelo treinado")
+        print("Modelo treinado com sucesso!")
+    
+    def _new_tokenizer(self):
+        from tensorflow import keras
+        
+        return keras.preprocessing.text.Tokenizer(
             num_words=self.max_words,
             oov_token='<OOV>'
         )
+    
+    def _build_model(self):
+        """Monta e compila o modelo (arquitetura usada por todos os modos de treino)"""
+        from tensorflow import keras
+        from tensorflow.keras import layers
+        
+        model = keras.Sequential([
+            layers.Embedding(self.max_words, self.embedding_dim, input_length=self.max_len,
+                             mask_zero=self.mask_padding),
+            layers.Bidirectional(layers.LSTM(self.lstm_units, return_sequences=True)),
+            layers.GlobalMaxPooling1D(),
+            layers.Dense(64, activation='relu'),
+            layers.Dropout(0.5),
+            layers.Dense(32, activation='relu'),
+            layers.Dropout(0.3),
+            layers.Dense(1, activation='sigmoid')
+        ])
+        
+        model.compile(
+            optimizer='adam',
+            loss='binary_crossentropy',
+            metrics=['accuracy']
+        )
+        return model
+    
+    def _train_synthetic(self):
+        """Treino padrão, em memória, com os dados sintéticos de `_generate_training_data`"""
+        from tensorflow import keras
+        
+        # Criar tokenizer
+        self.tokenizer = self._new_tokenizer()
         
         # Gerar dados de treino sintéticos
         ai_texts, human_texts = self._generate_training_data()
@@ -32,7 +544,8 @@ class AITextDetectorML:
         labels = [1] * len(ai_texts) + [0] * len(human_texts)
         
         # Treinar tokenizer
-        self.tokenizer.fit_on_texts(all_texts)
+        with self._stage('train_tokenizer', len(all_texts)):
+            self.tokenizer.fit_on_texts(all_texts)
         
         # Converter textos para sequências
         sequences = self.tokenizer.texts_to_sequences(all_texts)
@@ -44,36 +557,40 @@ class AITextDetectorML:
         )
         
         # Construir modelo
-        self.model = keras.Sequential([
-            layers.Embedding(self.max_words, 128, input_length=self.max_len),
-            layers.Bidirectional(layers.LSTM(64, return_sequences=True)),
-            layers.GlobalMaxPooling1D(),
-            layers.Dense(64, activation='relu'),
-            layers.Dropout(0.5),
-            layers.Dense(32, activation='relu'),
-            layers.Dropout(0.3),
-            layers.Dense(1, activation='sigmoid')
-        ])
-        
-        self.model.compile(
-            optimizer='adam',
-            loss='binary_crossentropy',
-            metrics=['accuracy']
-        )
+        self.model = self._build_model()
         
         # Treinar modelo
         X = np.array(padded)
         y = np.array(labels)
         
-        self.model.fit(
-            X, y,
-            epochs=10,
-            batch_size=32,
-            validation_split=0.2,
-            verbose=0
-        )
+        self._fit_epochs = self.epochs
+        with self._stage('train_fit', len(X)):
+            self.model.fit(
+                X, y,
+                epochs=self.epochs,
+                batch_size=32,
+                validation_split=0.2,
+                verbose=0,
+                callbacks=[keras.callbacks.LambdaCallback(
+                    on_epoch_begin=self._on_epoch_begin,
+                    on_epoch_end=self._on_epoch_end
+                )]
+            )
+    
+    def _on_epoch_begin(self, epoch, logs):
+        self._epoch_started = time.perf_counter()
+    
+    def _on_epoch_end(self, epoch, logs):
+        """Registra duração e métricas da época e repassa o progresso do treino"""
+        if self.instrumentation is not None:
+            self.instrumentation.record_stage('train_epoch', time.perf_counter() - self._epoch_started, 1)
+            for name, value in (logs or {}).items():
+                self._record_value(f'train_{name}', float(value))
         
-        print("Modelo treinado com sucesso!")
+        self._report_progress(
+            0.9 * (epoch + 1) / self._fit_epochs,
+            f"Treinando modelo: época {epoch + 1}/{self._fit_epochs}"
+        )
     
     def _generate_training_data(self):
         """Gera dados sintéticos para treino"""
@@ -123,90 +640,334 @@ class AITextDetectorML:
     
     def analyze_text(self, text):
         """Analisa o texto usando o modelo TensorFlow"""
-        if not text or len(text.strip()) < 20:
-            return 0, [], "Texto muito curto para análise"
+        return self.analyze_texts([text])[0]
+    
+    def analyze_texts(self, texts, batch_size=DEFAULT_BATCH_SIZE):
+        """Analisa uma lista de textos com uma única predição vetorizada por lote
         
-        # Preparar texto para o modelo
-        sequence = self.tokenizer.texts_to_sequences([text])
-        padded = keras.preprocessing.sequence.pad_sequences(
-            sequence,
-            maxlen=self.max_len,
-            padding='post',
-            truncating='post'
+        Retorna uma lista de tuplas (probabilidade, partes_suspeitas, relatório)
+        na mesma ordem da entrada. Textos curtos demais recebem o mesmo
+        resultado de `analyze_text` sem interromper o lote. Com `cascade`, toda
+        tupla traz ainda o estágio que decidiu o texto ('linear' ou 'bilstm';
+        None para textos curtos demais, que não passam por nenhum).
+        """
+        return self._with_cache(
+            list(texts),
+            lambda missing: self._analyze_texts_uncached(missing, batch_size),
+            variant=self.cascade.variant if self.cascade is not None else ''
+        )
+    
+    def _with_cache(self, texts, compute, variant='', normalize=True):
+        """Resolve pelo `cache` o que for possível e chama `compute` só com os textos ausentes
+        
+        Textos repetidos dentro da mesma chamada também são calculados uma única vez.
+        """
+        if self.cache is None:
+            return compute(texts)
+        
+        keys = [self.cache.make_key(text, self.model_version, variant, normalize) for text in texts]
+        results = [self.cache.get(key) for key in keys]
+        
+        pending = {}
+        for i, key in enumerate(keys):
+            if results[i] is None:
+                pending.setdefault(key, texts[i])
+        
+        if pending:
+            computed = dict(zip(pending, compute(list(pending.values()))))
+            self.cache.put_many(computed.items())
+            results = [computed[key] if result is None else result for key, result in zip(keys, results)]
+        
+        return results
+    
+    def _analyze_texts_uncached(self, texts, batch_size):
+        results = [None] * len(texts)
+        
+        valid_indices = []
+        for i, text in enumerate(texts):
+            if not text or len(text.strip()) < MIN_TEXT_LENGTH:
+                results[i] = (0, [], "Texto muito curto para análise")
+                if self.cascade is not None:
+                    results[i] += (None,)
+            else:
+                valid_indices.append(i)
+        
+        for start in range(0, len(valid_indices), batch_size):
+            batch_indices = valid_indices[start:start + batch_size]
+            batch_texts = [texts[i] for i in batch_indices]
+            
+            if self.cascade is not None:
+                # As estatísticas do estágio linear são as mesmas das heurísticas; calculadas uma vez
+                with self._stage('heuristics', len(batch_texts)):
+                    batch_stats = [self._text_stats(text) for text in batch_texts]
+                probabilities, stages = self._predict_cascade(batch_texts, batch_stats)
+            else:
+                # Uma única passagem pelo modelo para o lote inteiro
+                probabilities = self._predict_batch(batch_texts)
+                batch_stats = stages = None
+            
+            for k, (i, text, prediction) in enumerate(zip(batch_indices, batch_texts, probabilities)):
+                ai_probability = float(prediction) * 100
+                stage = stages[k] if stages is not None else None
+                
+                # Análise adicional para identificar partes suspeitas
+                with self._stage('heuristics'):
+                    stats = batch_stats[k] if batch_stats is not None else self._text_stats(text)
+                    suspicious_parts = self._identify_suspicious_parts(text, stats)
+                
+                # Gerar relatório
+                with self._stage('report'):
+                    report = self._generate_report(ai_probability, text, stats, stage)
+                
+                results[i] = (ai_probability, suspicious_parts, report)
+                if stages is not None:
+                    results[i] += (stage,)
+        
+        return results
+    
+    def _predict_cascade(self, texts, stats):
+        """Probabilidades (0-1) e estágio de cada texto: linear fora da faixa de escalonamento, BiLSTM dentro"""
+        with self._stage('cascade_linear', len(texts)):
+            probabilities = self.cascade.predict_proba(texts, stats)
+            escalate = self.cascade.escalate(probabilities)
+        
+        rows = np.flatnonzero(escalate)
+        self._record_value('cascade_escalated', len(rows))
+        if len(rows):
+            probabilities[rows] = self._predict_batch([texts[i] for i in rows])
+        return probabilities, ['bilstm' if escalated else 'linear' for escalated in escalate]
+    
+    def _prepare_sequences(self, texts, out=None):
+        """Tokeniza direto num array int32 (lote x max_len), já com padding
+        
+        Sem `out`, o resultado é uma view do buffer reutilizado do `FastTokenizer`,
+        válida até a próxima tokenização.
+        """
+        with self._stage('tokenize', len(texts)):
+            return self.fast_tokenizer.encode(texts, out)
+    
+    def _predict_batch(self, texts):
+        """Retorna a probabilidade de IA (0-1) de cada texto do lote"""
+        return self._predict_padded(self._prepare_sequences(texts))
+    
+    def _predict_padded(self, padded):
+        """Pontua uma matriz int32 (lote x max_len) já preparada, agrupando as linhas por comprimento
+        
+        Cada linha vai para o menor comprimento de `length_buckets` maior que
+        seu número de tokens (ou max_len), e cada grupo passa pelo modelo uma
+        vez, cortado nesse comprimento. Como o padding é mascarado e sempre
+        resta ao menos uma posição de padding quando havia alguma em max_len,
+        o score é o mesmo da matriz completa.
+        """
+        with self._stage('predict', len(padded)):
+            if not self.length_buckets or not self.mask_padding or not len(padded):
+                return self._run_model(padded)
+            
+            widths = np.array([b for b in self.length_buckets if b < self.max_len] + [self.max_len])
+            lengths = np.count_nonzero(padded, axis=1)
+            row_widths = widths[np.minimum(np.searchsorted(widths, lengths, side='right'), len(widths) - 1)]
+            
+            scores = np.empty(len(padded), dtype=np.float32)
+            for width in np.unique(row_widths):
+                rows = np.flatnonzero(row_widths == width)
+                scores[rows] = self._run_model(padded[rows, :width])
+            return scores
+    
+    def _run_model(self, padded):
+        """Uma única passagem pelo motor de inferência configurado"""
+        if self._numpy_model is not None:
+            return self._numpy_model.predict(padded)
+        
+        if self.use_compiled and self._infer is not None:
+            import tensorflow as tf
+            
+            return self._infer(tf.convert_to_tensor(padded, dtype=tf.int32)).numpy()[:, 0]
+        
+        predictions = self.model.predict(padded, batch_size=len(padded), verbose=0)
+        return predictions[:, 0]
+    
+    def analyze_text_chunked(self, text, aggregation='mean', stride=None):
+        """Analisa um texto longo por janelas deslizantes de tokens (ver `analyze_texts_chunked`)"""
+        return self.analyze_texts_chunked([text], aggregation=aggregation, stride=stride)[0]
+    
+    def analyze_texts_chunked(self, texts, aggregation='mean', stride=None, batch_size=DEFAULT_BATCH_SIZE):
+        """Analisa textos longos dividindo-os em janelas sobrepostas de `max_len` tokens
+        
+        Em vez de ignorar tudo após os primeiros `max_len` tokens, cada documento é
+        dividido em janelas com passo `stride` (padrão: metade de `max_len`). As
+        janelas de todos os textos do lote são pontuadas numa única passagem pelo
+        modelo e agregadas com `aggregation` ('mean', 'max' ou 'weighted', média
+        ponderada pelo número de tokens de cada janela).
+        
+        Retorna tuplas (probabilidade, partes_suspeitas, relatório, janelas), onde
+        cada janela é um dicionário com offsets de caracteres, tokens e score.
+        """
+        if aggregation not in WINDOW_AGGREGATIONS:
+            raise ValueError(f"Agregação inválida: {aggregation} (use {', '.join(WINDOW_AGGREGATIONS)})")
+        
+        stride = stride or max(self.max_len // 2, 1)
+        
+        # Offsets das janelas dependem do texto exato, então ele não é normalizado na chave
+        return self._with_cache(
+            list(texts),
+            lambda missing: self._analyze_texts_chunked_uncached(missing, aggregation, stride, batch_size),
+            variant=f'chunked:{aggregation}:{stride}',
+            normalize=False
         )
+    
+    def _analyze_texts_chunked_uncached(self, texts, aggregation, stride, batch_size):
+        results = [None] * len(texts)
         
-        # Fazer predição
-        prediction = self.model.predict(padded, verbose=0)[0][0]
-        ai_probability = float(prediction) * 100
+        valid_indices = []
+        for i, text in enumerate(texts):
+            if not text or len(text.strip()) < MIN_TEXT_LENGTH:
+                results[i] = (0, [], "Texto muito curto para análise", [])
+            else:
+                valid_indices.append(i)
         
-        # Análise adicional para identificar partes suspeitas
-        suspicious_parts = self._identify_suspicious_parts(text)
+        for start in range(0, len(valid_indices), batch_size):
+            batch_indices = valid_indices[start:start + batch_size]
+            batch_texts = [texts[i] for i in batch_indices]
+            
+            windows_per_text, padded = self._split_windows(batch_texts, stride)
+            
+            # Todas as janelas do lote numa única passagem pelo modelo
+            scores = self._predict_padded(padded) if len(padded) else []
+            
+            position = 0
+            for i, text, windows in zip(batch_indices, batch_texts, windows_per_text):
+                for window in windows:
+                    window['score'] = float(scores[position]) * 100
+                    position += 1
+                
+                ai_probability = self._aggregate_windows(windows, aggregation)
+                with self._stage('heuristics'):
+                    stats = self._text_stats(text)
+                    suspicious_parts = self._identify_suspicious_parts(text, stats)
+                
+                with self._stage('report'):
+                    report = self._generate_report(ai_probability, text, stats)
+                    report += self._generate_window_report(windows, aggregation, text)
+                
+                results[i] = (ai_probability, suspicious_parts, report, windows)
+        
+        return results
+    
+    def _split_windows(self, texts, stride):
+        """Divide cada texto em janelas de tokens e monta a matriz int32 de todas as janelas
         
-        # Gerar relatório
-        report = self._generate_report(ai_probability, text)
+        Retorna (janelas_por_texto, matriz). Os offsets de caracteres de cada
+        janela vêm de `WORD_PATTERN`, que reproduz a separação de palavras do
+        tokenizer; se a contagem divergir, os offsets ficam como None.
+        """
+        with self._stage('tokenize', len(texts)):
+            sequences = self.fast_tokenizer.texts_to_sequences(texts)
+        windows_per_text = []
+        rows = []
         
-        return ai_probability, suspicious_parts, report
+        for text, sequence in zip(texts, sequences):
+            spans = [match.span() for match in WORD_PATTERN.finditer(text)]
+            if len(spans) != len(sequence):
+                spans = None
+            
+            starts = list(range(0, max(len(sequence) - self.max_len, 0) + 1, stride))
+            if starts[-1] + self.max_len < len(sequence):
+                starts.append(len(sequence) - self.max_len)
+            
+            windows = []
+            for token_start in starts:
+                token_end = min(token_start + self.max_len, len(sequence))
+                window = {
+                    'token_start': token_start,
+                    'token_end': token_end,
+                    'start': spans[token_start][0] if spans and token_end > token_start else None,
+                    'end': spans[token_end - 1][1] if spans and token_end > token_start else None,
+                }
+                windows.append(window)
+                rows.append(sequence[token_start:token_end])
+            
+            windows_per_text.append(windows)
+        
+        with self._stage('pad', len(rows)):
+            padded = self.fast_tokenizer.pad(rows)
+        return windows_per_text, padded
+    
+    @staticmethod
+    def _aggregate_windows(windows, aggregation):
+        """Combina os scores das janelas num score do documento"""
+        scores = np.array([window['score'] for window in windows])
+        if aggregation == 'max':
+            return float(scores.max())
+        if aggregation == 'weighted':
+            weights = np.array([max(window['token_end'] - window['token_start'], 1) for window in windows])
+            return float(np.average(scores, weights=weights))
+        return float(scores.mean())
     
-    def _identify_suspicious_parts(self, text):
+    def _generate_window_report(self, windows, aggregation, text):
+        """Seção do relatório com o score de cada janela e o início do trecho correspondente"""
+        report = f"\nAnálise por janelas ({len(windows)} de até {self.max_len} tokens, agregação: {aggregation}):\n"
+        
+        for i, window in enumerate(windows, 1):
+            marker = " ⚠" if window['score'] >= 70 else ""
+            report += f"• Janela {i} (tokens {window['token_start']}-{window['token_end']}): {window['score']:.1f}%{marker}"
+            if window['start'] is not None:
+                snippet = ' '.join(text[window['start']:window['end']].split()[:8])
+                report += f' "{snippet}..."'
+            report += "\n"
+        
+        return report
+    
+    def _text_stats(self, text):
+        """Cria o contexto de análise compartilhado por heurísticas e relatório"""
+        return TextStats(text, self.connector_matcher)
+    
+    def _identify_suspicious_parts(self, text, stats=None):
         """Identifica partes específicas que parecem geradas por IA"""
+        stats = stats or self._text_stats(text)
         suspicious = []
         
         # Conectivos formais típicos de IA
-        ai_connectors = [
-            'além disso', 'portanto', 'no entanto', 'consequentemente',
-            'é importante notar', 'vale ressaltar', 'cabe destacar',
-            'neste contexto', 'dessa forma', 'assim sendo',
-            'furthermore', 'moreover', 'however', 'therefore',
-            'additionally', 'consequently'
+        found_connectors = [
+            f"'{connector}' ({count}x)"
+            for connector, count in stats.connector_counts.items()
         ]
         
-        text_lower = text.lower()
-        found_connectors = []
-        
-        for connector in ai_connectors:
-            if connector in text_lower:
-                count = text_lower.count(connector)
-                found_connectors.append(f"'{connector}' ({count}x)")
-        
         if found_connectors:
             suspicious.append(f"Conectivos formais detectados: {', '.join(found_connectors[:5])}")
         
         # Verificar uniformidade de sentenças
-        sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
-        if len(sentences) >= 3:
-            lengths = [len(s.split()) for s in sentences]
-            avg_len = np.mean(lengths)
-            std_len = np.std(lengths)
+        if stats.sentence_count >= 3:
+            avg_len = stats.feature('sentence_length_mean')
+            std_len = stats.feature('sentence_length_std')
             
             if std_len < 3 and avg_len > 10:
                 suspicious.append(f"Sentenças muito uniformes (média: {avg_len:.1f} palavras, desvio: {std_len:.1f})")
         
         # Verificar padrões repetitivos
-        if len(sentences) >= 3:
-            starts = [s.split()[0].lower() if s.split() else '' for s in sentences]
-            start_counter = Counter(starts)
-            most_common = start_counter.most_common(1)[0]
+        if stats.sentence_count >= 3:
+            most_common = stats.feature('most_common_start')
             
-            if most_common[1] > len(sentences) * 0.3:
+            if most_common[1] > stats.sentence_count * 0.3:
                 suspicious.append(f"Padrão repetitivo: {most_common[1]} sentenças começam com '{most_common[0]}'")
         
         return suspicious
     
-    def _generate_report(self, ai_probability, text):
-        """Gera relatório detalhado da análise"""
+    def _generate_report(self, ai_probability, text, stats=None, stage=None):
+        """Gera relatório detalhado da análise
+        
+        `stage` é o estágio da cascata que decidiu o score (None sem cascata).
+        """
+        stats = stats or self._text_stats(text)
         report = "=== Análise com TensorFlow/Keras ===\n\n"
         
         # Estatísticas do texto
-        words = text.split()
-        sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
-        
         report += f"Estatísticas do texto:\n"
-        report += f"• Total de palavras: {len(words)}\n"
-        report += f"• Total de sentenças: {len(sentences)}\n"
-        report += f"• Média de palavras por sentença: {len(words)/max(len(sentences), 1):.1f}\n\n"
+        report += f"• Total de palavras: {stats.word_count}\n"
+        report += f"• Total de sentenças: {stats.sentence_count}\n"
+        report += f"• Média de palavras por sentença: {stats.word_count/max(stats.sentence_count, 1):.1f}\n\n"
         
         # Interpretação do modelo
-        report += f"Resultado do modelo neural:\n"
+        report += f"{REPORT_RESULT_TITLES[stage]}:\n"
         report += f"• Probabilidade de IA: {ai_probability:.2f}%\n"
         report += f"• Probabilidade humana: {100-ai_probability:.2f}%\n\n"
         
@@ -240,20 +1001,81 @@ class AIDetectorGUI:
         self.detector = None
         self.current_text = ""
         
+        # Carregamento e análises rodam num único worker (o modelo não é usado em paralelo);
+        # os resultados voltam pela fila, lida na thread do Tk por `_poll_results`
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.results = queue.Queue()
+        self.analysis_generation = 0
+        self.pending_analysis = None
+        
+        # Análise ao vivo: reanalisa só os parágrafos alterados após uma pausa na digitação
+        self.incremental = None
+        self.live_var = tk.BooleanVar(value=False)
+        self._debounce_id = None
+        
         self._create_widgets()
+        self.root.protocol('WM_DELETE_WINDOW', self._on_close)
         self._initialize_model()
+        self._poll_results()
     
     def _initialize_model(self):
         """Inicializa o modelo em background"""
         self.status_label.config(text="⏳ Carregando modelo TensorFlow...")
-        self.root.update()
-        
+        self.executor.submit(self._load_model_worker)
+    
+    def _load_model_worker(self):
+        """Executado no worker: carrega (ou treina) o modelo e envia o resultado à fila"""
         try:
-            self.detector = AITextDetectorML()
-            self.status_label.config(text="✓ Modelo carregado e pronto!")
-            self.load_btn.config(state='normal')
+            detector = AITextDetectorML(
+                progress_callback=lambda fraction, message: self.results.put(('progress', (fraction, message))),
+                cache=ResultCache()
+            )
+            self.results.put(('model', detector))
         except Exception as e:
-            self.status_label.config(text=f"✗ Erro ao carregar modelo: {str(e)}")
+            self.results.put(('model_error', e))
+    
+    def _poll_results(self):
+        """Processa as mensagens do worker na thread do Tk e reagenda a si mesmo"""
+        try:
+            while True:
+                kind, payload = self.results.get_nowait()
+                
+                if kind == 'progress':
+                    fraction, message = payload
+                    self.status_label.config(text=f"⏳ {message} ({fraction * 100:.0f}%)")
+                    self.progress['value'] = fraction * 100
+                elif kind == 'model':
+                    from incremental import IncrementalAnalyzer
+                    
+                    self.detector = payload
+                    self.incremental = IncrementalAnalyzer(self.detector)
+                    self.progress['value'] = 0
+                    self.status_label.config(text="✓ Modelo carregado e pronto!")
+                    self.load_btn.config(state='normal')
+                    self._on_text_change()
+                elif kind == 'model_error':
+                    self.status_label.config(text=f"✗ Erro ao carregar modelo: {str(payload)}")
+                elif kind == 'analysis':
+                    generation, result = payload
+                    if generation == self.analysis_generation:
+                        self._show_analysis(*result)
+                        self.analyze_btn.config(text="🔍 Analisar com IA", state='normal')
+                elif kind == 'analysis_error':
+                    generation, error = payload
+                    if generation == self.analysis_generation:
+                        self._show_error(f"Erro durante análise: {str(error)}")
+                        self.analyze_btn.config(text="🔍 Analisar com IA", state='normal')
+        except queue.Empty:
+            pass
+        
+        self.root.after(POLL_INTERVAL_MS, self._poll_results)
+    
+    def _on_close(self):
+        """Descarta análises pendentes e fecha a janela sem esperar o worker"""
+        if self._debounce_id is not None:
+            self.root.after_cancel(self._debounce_id)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
     
     def _create_widgets(self):
         # Título
@@ -329,6 +1151,17 @@ class AIDetectorGUI:
         )
         self.analyze_btn.pack(side='left')
         
+        self.live_check = tk.Checkbutton(
+            button_frame,
+            text="⚡ Análise ao vivo",
+            variable=self.live_var,
+            command=self._on_live_toggle,
+            font=('Arial', 10),
+            bg='#f0f0f0',
+            cursor='hand2'
+        )
+        self.live_check.pack(side='left', padx=(15, 0))
+        
         # Área de texto
         text_label = tk.Label(
             main_frame,
@@ -348,6 +1181,7 @@ class AIDetectorGUI:
         )
         self.text_area.pack(fill='both', expand=True, pady=(0, 15))
         self.text_area.bind('<KeyRelease>', self._on_text_change)
+        self.text_area.tag_configure('connector', background='#ffe082')
         
         # Resultado
         result_frame = tk.Frame(main_frame, bg='white', relief='solid', borderwidth=1)
@@ -404,16 +1238,45 @@ class AIDetectorGUI:
         self.report_area.config(state='disabled')
     
     def _on_text_change(self, event=None):
-        """Habilita botão de análise quando há texto"""
+        """Habilita botão de análise quando há texto e descarta análises do texto anterior"""
         if self.detector is None:
             return
             
         text = self.text_area.get('1.0', 'end-1c').strip()
+        if text != self.current_text:
+            self.current_text = text
+            self._cancel_pending_analysis()
+            if self.live_var.get():
+                self._schedule_live_analysis()
+        
         if text:
             self.analyze_btn.config(state='normal')
         else:
             self.analyze_btn.config(state='disabled')
     
+    def _on_live_toggle(self):
+        """Ao ativar a análise ao vivo, analisa o texto atual logo em seguida"""
+        if self.live_var.get() and self.detector is not None:
+            self._schedule_live_analysis()
+    
+    def _schedule_live_analysis(self):
+        """Reinicia a espera (debounce): a análise só roda após LIVE_DEBOUNCE_MS sem edições"""
+        if self._debounce_id is not None:
+            self.root.after_cancel(self._debounce_id)
+        self._debounce_id = self.root.after(LIVE_DEBOUNCE_MS, self._run_live_analysis)
+    
+    def _run_live_analysis(self):
+        """Envia ao worker a análise incremental, por parágrafos, do texto atual"""
+        self._debounce_id = None
+        text = self.text_area.get('1.0', 'end-1c').strip()
+        if not text or self.detector is None:
+            return
+        
+        self._cancel_pending_analysis()
+        self.current_text = text
+        generation = self.analysis_generation
+        self.pending_analysis = self.executor.submit(self._analyze_worker, generation, text, True)
+    
     def load_file(self):
         """Carrega arquivo de texto"""
         filename = filedialog.askopenfilename(
@@ -430,8 +1293,7 @@ class AIDetectorGUI:
                     content = file.read()
                     self.text_area.delete('1.0', 'end')
                     self.text_area.insert('1.0', content)
-                    self.current_text = content
-                    self.analyze_btn.config(state='normal')
+                    self._on_text_change()
             except Exception as e:
                 self._show_error(f"Erro ao carregar arquivo: {str(e)}")
     
@@ -448,49 +1310,81 @@ class AIDetectorGUI:
             return
         
         # Mostrar que está processando
+        self._cancel_pending_analysis()
+        self.current_text = text
         self.analyze_btn.config(text="⏳ Analisando...", state='disabled')
-        self.root.update()
+        
+        # Realiza análise com TensorFlow no worker
+        generation = self.analysis_generation
+        self.pending_analysis = self.executor.submit(self._analyze_worker, generation, text)
+    
+    def _analyze_worker(self, generation, text, incremental=False):
+        """Executado no worker: analisa o texto, a menos que a análise já tenha ficado obsoleta
+        
+        Com `incremental`, usa o `IncrementalAnalyzer`, que só pontua os parágrafos alterados.
+        """
+        if generation != self.analysis_generation:
+            return
         
         try:
-            # Realiza análise com TensorFlow
-            score, suspicious_parts, report = self.detector.analyze_text(text)
-            
-            # Atualiza interface
-            self.result_label.config(text=f"Probabilidade de ser IA: {score:.1f}%")
-            self.progress['value'] = score
-            
-            # Muda cor baseado no score
-            if score < 30:
-                color = '#4caf50'  # Verde
-            elif score < 50:
-                color = '#ff9800'  # Laranja
-            elif score < 70:
-                color = '#ff5722'  # Laranja escuro
+            if incremental:
+                result = self.incremental.analyze(text)
             else:
-                color = '#d32f2f'  # Vermelho
-            
-            style = ttk.Style()
-            style.configure('Custom.Horizontal.TProgressbar', background=color)
-            
-            # Atualiza relatório
-            self.report_area.config(state='normal')
-            self.report_area.delete('1.0', 'end')
-            
-            full_report = report
-            
-            if suspicious_parts:
-                full_report += "\n\nIndicadores suspeitos encontrados:\n"
-                for i, part in enumerate(suspicious_parts, 1):
-                    full_report += f"{i}. {part}\n"
-            
-            self.report_area.insert('1.0', full_report)
-            self.report_area.config(state='disabled')
-            
+                result = self.detector.analyze_text(text)
+            self.results.put(('analysis', (generation, result)))
         except Exception as e:
-            self._show_error(f"Erro durante análise: {str(e)}")
+            self.results.put(('analysis_error', (generation, e)))
+    
+    def _cancel_pending_analysis(self):
+        """Marca a análise em andamento como obsoleta; seu resultado será ignorado"""
+        self.analysis_generation += 1
+        if self.pending_analysis is not None:
+            self.pending_analysis.cancel()
+            self.pending_analysis = None
+        self.analyze_btn.config(text="🔍 Analisar com IA")
+    
+    def _show_analysis(self, score, suspicious_parts, report):
+        """Atualiza resultado, barra e relatório com uma análise concluída"""
+        self.result_label.config(text=f"Probabilidade de ser IA: {score:.1f}%")
+        self.progress['value'] = score
+        
+        # Muda cor baseado no score
+        if score < 30:
+            color = '#4caf50'  # Verde
+        elif score < 50:
+            color = '#ff9800'  # Laranja
+        elif score < 70:
+            color = '#ff5722'  # Laranja escuro
+        else:
+            color = '#d32f2f'  # Vermelho
+        
+        style = ttk.Style()
+        style.configure('Custom.Horizontal.TProgressbar', background=color)
+        
+        # Atualiza relatório
+        self.report_area.config(state='normal')
+        self.report_area.delete('1.0', 'end')
+        
+        full_report = report
+        
+        if suspicious_parts:
+            full_report += "\n\nIndicadores suspeitos encontrados:\n"
+            for i, part in enumerate(suspicious_parts, 1):
+                full_report += f"{i}. {part}\n"
         
-        finally:
-            self.analyze_btn.config(text="🔍 Analisar com IA", state='normal')
+        self.report_area.insert('1.0', full_report)
+        self.report_area.config(state='disabled')
+        
+        self._highlight_connectors()
+    
+    def _highlight_connectors(self):
+        """Destaca no texto os conectivos formais encontrados pelo detector"""
+        self.text_area.tag_remove('connector', '1.0', 'end')
+        content = self.text_area.get('1.0', 'end-1c')
+        
+        for spans in self.detector.connector_matcher.find(content).values():
+            for start, end in spans:
+                self.text_area.tag_add('connector', f'1.0+{start}c', f'1.0+{end}c')
     
     def _show_error(self, message):
         """Mostra mensagem de erro"""
@@ -522,11 +1416,528 @@ class AIDetectorGUI:
         btn.pack()
 
 
-def main():
+def iter_records(source, text_field='text', id_field='id'):
+    """Gera tuplas (id, texto, erro) de um JSONL, da entrada padrão ('-') ou de um diretório de .txt
+    
+    Os registros são lidos um a um, sem carregar a entrada inteira na memória.
+    Linhas inválidas geram um erro no lugar do texto para manter os offsets alinhados.
+    """
+    if source != '-' and os.path.isdir(source):
+        names = sorted(
+            entry.name for entry in os.scandir(source)
+            if entry.is_file() and entry.name.endswith('.txt')
+        )
+        for name in names:
+            try:
+                with open(os.path.join(source, name), 'r', encoding='utf-8') as file:
+                    yield name, file.read(), None
+            except (OSError, UnicodeDecodeError) as e:
+                yield name, None, str(e)
+        return
+    
+    if source == '-':
+        stream = contextlib.nullcontext(sys.stdin)
+    else:
+        stream = open(source, 'r', encoding='utf-8')
+    
+    with stream as lines:
+        for line_number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f"JSON inválido: {e}"
+                continue
+            
+            if not isinstance(record, dict):
+                yield line_number, None, "Registro JSON não é um objeto"
+                continue
+            
+            record_id = record.get(id_field, line_number)
+            text = record.get(text_field)
+            if not isinstance(text, str):
+                yield record_id, None, f"Campo '{text_field}' ausente"
+                continue
+            
+            yield record_id, text, None
+
+
+def batched(iterable, size):
+    """Agrupa um iterável em listas de até `size` itens"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def score_batch(detector, batch, include_report=False, chunked=False, aggregation='mean', dedup=None):
+    """Pontua um lote de (offset, (id, texto, erro)) e retorna um dicionário de resultado por registro
+    
+    Com `dedup` (um `dedup.NearDuplicateIndex`), quase duplicatas de textos já
+    pontuados reaproveitam o resultado do representante do cluster, e cada
+    resultado informa o seu cluster.
+    """
+    texts = [text for _, (_, text, error) in batch if error is None]
+    
+    def compute(items):
+        if chunked:
+            return detector.analyze_texts_chunked(items, aggregation=aggregation, batch_size=len(batch))
+        return detector.analyze_texts(items, batch_size=len(batch))
+    
+    if dedup is None:
+        analyses = iter(compute(texts))
+        clusters = repeat(None)
+    else:
+        ids = [record_id for _, (record_id, _, error) in batch if error is None]
+        analyses, clusters = dedup.analyze(texts, ids, compute)
+        analyses, clusters = iter(analyses), iter(clusters)
+    
+    results = []
+    for index, (record_id, text, error) in batch:
+        result = {'offset': index, 'id': record_id}
+        if error is not None:
+            result['error'] = error
+        else:
+            analysis = next(analyses)
+            ai_probability, suspicious_parts, report = analysis[:3]
+            result['ai_probability'] = round(ai_probability, 4)
+            result['suspicious_parts'] = suspicious_parts
+            if chunked:
+                result['windows'] = analysis[3]
+            elif len(analysis) > 3:
+                result['stage'] = analysis[3]
+            if include_report:
+                result['report'] = report
+            cluster = next(clusters)
+            if cluster is not None:
+                result.update(cluster)
+        results.append(result)
+    
+    return results
+
+
+def score_records(detector, records, batch_size=DEFAULT_BATCH_SIZE, offset=0, include_report=False,
+                  chunked=False, aggregation='mean', dedup=None):
+    """Pontua registros em lotes e gera um dicionário de resultado por registro
+    
+    `offset` pula os primeiros registros (retomada após falha); cada resultado
+    carrega o seu offset na entrada. Com `chunked`, textos longos são pontuados
+    por janelas e o resultado inclui o score de cada janela. `dedup` agrupa
+    quase duplicatas (ver `score_batch`).
+    """
+    indexed = enumerate(islice(records, offset, None), offset)
+    if dedup is not None:
+        # Resultados só valem para o mesmo modo de análise (janelas e cascata)
+        chunk_variant = f"chunked:{aggregation}" if chunked else ''
+        cascade_variant = detector.cascade.variant if detector.cascade is not None else ''
+        dedup.bind(detector.model_version, '|'.join(filter(None, [chunk_variant, cascade_variant])))
+    
+    for batch in batched(indexed, batch_size):
+        yield from score_batch(detector, batch, include_report, chunked, aggregation, dedup)
+
+
+def _resume_offset(path):
+    """Próximo offset a processar segundo a última linha completa de um JSONL de saída
+    
+    Uma linha final incompleta (escrita interrompida por falha) é descartada.
+    """
+    if not os.path.isfile(path):
+        return 0
+    
+    last_line = None
+    complete_size = 0
+    with open(path, 'rb') as file:
+        for line in file:
+            if not line.endswith(b'\n'):
+                break
+            complete_size += len(line)
+            if line.strip():
+                last_line = line
+    
+    with open(path, 'r+b') as file:
+        file.truncate(complete_size)
+    
+    if last_line is None:
+        return 0
+    return json.loads(last_line)['offset'] + 1
+
+
+def run_score(args):
+    """Modo sem interface gráfica: pontua a entrada e escreve JSONL à medida que avança"""
+    offset = args.offset
+    if args.resume:
+        if args.output == '-':
+            raise SystemExit("--resume exige --output com um arquivo")
+        offset = _resume_offset(args.output)
+    
+    from corpus_store import CorpusStore
+    
+    if CorpusStore.exists(args.input):
+        return run_score_store(args, offset)
+    
+    records = iter_records(args.input, text_field=args.text_field, id_field=args.id_field)
+    length_buckets = () if args.no_buckets else DEFAULT_LENGTH_BUCKETS
+    cache = None
+    scorer = None
+    dedup = None
+    aggregator = None
+    instrumentation = None
+    
+    if args.dedup_threshold is not None or args.dedup_index:
+        if args.workers > 1:
+            raise SystemExit("A detecção de quase duplicatas não se aplica com --workers")
+        from dedup import DEFAULT_THRESHOLD, NearDuplicateIndex
+        
+        threshold = args.dedup_threshold or DEFAULT_THRESHOLD
+        if args.dedup_index and os.path.isfile(args.dedup_index):
+            dedup = NearDuplicateIndex.load(args.dedup_index, threshold, args.dedup_max_entries)
+        else:
+            dedup = NearDuplicateIndex(threshold, max_entries=args.dedup_max_entries)
+    
+    if args.cascade and (args.workers > 1 or args.chunked):
+        raise SystemExit("--cascade não se aplica com --workers nem com --chunked")
+    
+    # Mensagens do modelo vão para stderr para não misturar com o JSONL da saída padrão
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.workers > 1:
+            from parallel import ParallelScorer
+            
+            scorer = ParallelScorer(
+                artifact_dir=args.artifact_dir,
+                workers=args.workers,
+                chunk_size=args.batch_size,
+                intra_op_threads=args.tf_threads,
+                inter_op_threads=args.tf_threads,
+                use_compiled=not args.use_predict,
+                engine=args.engine,
+                length_buckets=length_buckets,
+                cache_size=args.cache_size,
+                include_report=args.include_report,
+                chunked=args.chunked,
+                aggregation=args.aggregation
+            )
+            results = scorer.score(records, offset)
+        else:
+            cache = ResultCache(args.cache_size, args.cache_db) if args.cache_size > 0 else None
+            if args.metrics_file:
+                aggregator = HistogramAggregator()
+                instrumentation = Instrumentation([aggregator])
+            detector = AITextDetectorML(
+                artifact_dir=args.artifact_dir,
+                use_compiled=not args.use_predict,
+                cache=cache,
+                instrumentation=instrumentation,
+                engine=args.engine,
+                length_buckets=length_buckets
+            )
+            if args.cascade:
+                from cascade import Cascade, load_linear_model, warn_small_calibration
+                
+                try:
+                    detector.cascade = Cascade(load_linear_model(args.cascade_model), args.cascade_band)
+                except FileNotFoundError as e:
+                    raise SystemExit(str(e))
+                warn_small_calibration(detector.cascade.model)
+            results = score_records(detector, records, args.batch_size, offset, args.include_report,
+                                    chunked=args.chunked, aggregation=args.aggregation, dedup=dedup)
+    
+    scored = _write_results(args, results)
+    print(f"{scored} registros pontuados (a partir do offset {offset})", file=sys.stderr)
+    if scorer is not None:
+        print(f"Workers: {json.dumps(scorer.stats())}", file=sys.stderr)
+        scorer.close()
+    if cache is not None:
+        print(f"Cache: {json.dumps(cache.stats())}", file=sys.stderr)
+        cache.close()
+    if dedup is not None:
+        print(f"Quase duplicatas: {json.dumps(dedup.stats())}", file=sys.stderr)
+        if args.dedup_index:
+            dedup.save(args.dedup_index)
+    if aggregator is not None:
+        with open(args.metrics_file, 'w', encoding='utf-8') as file:
+            file.write(aggregator.to_prometheus())
+        for stage, summary in aggregator.summary()['stages'].items():
+            print(f"Etapa {stage}: {summary['calls']} chamadas, {summary['total_seconds']:.3f}s", file=sys.stderr)
+
+
+def _write_results(args, results):
+    """Escreve os resultados em JSONL em --output, à medida que chegam; retorna quantos foram escritos"""
+    if args.output == '-':
+        output = contextlib.nullcontext(sys.stdout)
+    else:
+        output = open(args.output, 'a' if args.resume else 'w', encoding='utf-8')
+    
+    scored = 0
+    
+    with output as out:
+        for result in results:
+            out.write(json.dumps(result, ensure_ascii=False) + '\n')
+            scored += 1
+            if scored % args.batch_size == 0:
+                out.flush()
+    
+    return scored
+
+
+def run_score_store(args, offset):
+    """Pontua um corpus pré-tokenizado (corpus_store.py), reconstruindo-o se o vocabulário mudou
+    
+    Só o score do modelo é calculado: partes suspeitas e relatório dependem do texto original.
+    """
+    from corpus_store import CorpusStore, score_store
+    
+    if args.workers > 1 or args.chunked or args.include_report:
+        raise SystemExit("Com um store, --workers, --chunked e --include-report não se aplicam")
+    
+    with contextlib.redirect_stdout(sys.stderr):
+        detector = AITextDetectorML(
+            artifact_dir=args.artifact_dir,
+            use_compiled=not args.use_predict,
+            engine=args.engine,
+            length_buckets=() if args.no_buckets else DEFAULT_LENGTH_BUCKETS
+        )
+        with open(os.path.join(detector.artifact_dir, TOKENIZER_FILE), 'r', encoding='utf-8') as file:
+            store = CorpusStore(args.input).ensure_vocabulary(file.read())
+    
+    scored = _write_results(args, score_store(detector, store, args.batch_size, offset))
+    print(f"{scored} documentos do store pontuados (a partir do offset {offset})", file=sys.stderr)
+
+
+def run_serve(args):
+    """Modo serviço: carrega o modelo uma vez e atende requisições HTTP com micro-batching"""
+    import server
+    
+    cache = ResultCache(args.cache_size, args.cache_db) if args.cache_size > 0 else None
+    aggregator = None
+    instrumentation = None
+    if not args.no_metrics:
+        aggregator = HistogramAggregator()
+        instrumentation = Instrumentation([aggregator])
+    
+    detector = AITextDetectorML(
+        artifact_dir=args.artifact_dir,
+        cache=cache,
+        instrumentation=instrumentation,
+        engine=args.engine,
+        length_buckets=() if args.no_buckets else DEFAULT_LENGTH_BUCKETS
+    )
+    server.serve(
+        detector,
+        host=args.host,
+        port=args.port,
+        timeout=args.timeout,
+        aggregator=aggregator,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        max_queue=args.max_queue
+    )
+
+
+def run_train(args):
+    """Treina o modelo a partir de um corpus rotulado e grava o artefato em --artifact-dir"""
+    from training import StreamingTrainer, StoreTrainer
+    
+    options = dict(
+        text_field=args.text_field,
+        label_field=args.label_field,
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        shuffle_buffer=args.shuffle_buffer,
+        checkpoint_dir=args.checkpoint_dir,
+        checkpoint_every=args.checkpoint_every,
+        seed=args.seed
+    )
+    if args.store:
+        trainer = StoreTrainer(args.store, args.sources, id_field=args.id_field, **options)
+    elif args.sources:
+        trainer = StreamingTrainer(args.sources, **options)
+    else:
+        raise SystemExit("Informe os arquivos de treino ou --store")
+    AITextDetectorML(artifact_dir=args.artifact_dir, retrain=True, engine=args.engine, trainer=trainer)
+    print(f"Artefato salvo em {args.artifact_dir}")
+
+
+def run_store(args):
+    """Cria um corpus pré-tokenizado com o vocabulário do modelo, ou acrescenta arquivos novos a ele"""
+    from corpus_store import CorpusStore
+    
+    detector = AITextDetectorML(artifact_dir=args.artifact_dir, engine=args.engine)
+    with open(os.path.join(detector.artifact_dir, TOKENIZER_FILE), 'r', encoding='utf-8') as file:
+        tokenizer_json = file.read()
+    
+    if CorpusStore.exists(args.store) and not args.rebuild:
+        store = CorpusStore(args.store).ensure_vocabulary(tokenizer_json)
+    elif CorpusStore.exists(args.store):
+        store = CorpusStore(args.store).rebuild(tokenizer_json)
+    else:
+        store = CorpusStore.create(args.store, tokenizer_json)
+    
+    added = store.ingest(args.sources, args.text_field, args.label_field, args.id_field)
+    print(f"{added} documentos acrescentados")
+    print(f"Store: {json.dumps(store.stats())}")
+
+
+def run_cascade(args):
+    """Treina ou avalia o estágio linear da cascata (ver cascade.py)"""
+    import cascade
+    
+    cascade.run(args)
+
+
+def run_bench(args):
+    """Executa os benchmarks de desempenho (ver benchmark.py)"""
+    import benchmark
+    
+    benchmark.run(args)
+
+
+def run_gui():
+    if tk is None:
+        raise SystemExit("Tkinter não está disponível; use o modo 'score' na linha de comando")
     root = tk.Tk()
     app = AIDetectorGUI(root)
     root.mainloop()
 
 
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Detector de texto gerado por IA")
+    parser.add_argument('--artifact-dir', default=DEFAULT_ARTIFACT_DIR, help="Diretório do artefato do modelo")
+    parser.add_argument('--engine', choices=ENGINES, default='numpy',
+                        help="Motor de inferência ('numpy' não importa o TensorFlow, exceto para treinar)")
+    parser.add_argument('--no-buckets', action='store_true',
+                        help="Roda todo texto com max_len tokens, sem agrupar por comprimento")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    score = subparsers.add_parser('score', help="Pontua textos em lote sem interface gráfica")
+    score.add_argument('input',
+                       help="Arquivo JSONL, diretório de .txt, diretório de um store (ver 'store') "
+                            "ou '-' para a entrada padrão")
+    score.add_argument('-o', '--output', default='-', help="Arquivo JSONL de saída ('-' para a saída padrão)")
+    score.add_argument('--text-field', default='text', help="Campo com o texto em cada registro JSONL")
+    score.add_argument('--id-field', default='id', help="Campo com o identificador em cada registro JSONL")
+    score.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    score.add_argument('--offset', type=int, default=0, help="Número de registros iniciais a pular")
+    score.add_argument('--resume', action='store_true',
+                       help="Retoma após o último registro já escrito em --output")
+    score.add_argument('--include-report', action='store_true', help="Inclui o relatório completo na saída")
+    score.add_argument('--workers', type=int, default=1,
+                       help="Número de processos de pontuação (1 = no próprio processo)")
+    score.add_argument('--tf-threads', type=int, default=1,
+                       help="Threads de cada worker (com --workers > 1): BLAS/OpenMP no motor NumPy, "
+                            "intra/inter-op no TensorFlow")
+    score.add_argument('--use-predict', action='store_true',
+                       help="Usa model.predict em vez do caminho compilado (com --engine tensorflow, para comparação)")
+    score.add_argument('--cache-size', type=int, default=4096,
+                       help="Entradas do cache de resultados em memória (0 desativa o cache)")
+    score.add_argument('--cache-db', help="Arquivo SQLite do cache persistente de resultados")
+    score.add_argument('--metrics-file',
+                       help="Grava os tempos por etapa (formato Prometheus) neste arquivo ao final")
+    score.add_argument('--chunked', action='store_true',
+                       help="Pontua textos longos por janelas deslizantes em vez de truncar em max_len")
+    score.add_argument('--dedup-threshold', type=float,
+                       help="Agrupa quase duplicatas (similaridade de Jaccard >= limiar, ex.: 0.8) e reaproveita "
+                            "o resultado do representante de cada cluster")
+    score.add_argument('--dedup-index', help="Arquivo .npz do índice de quase duplicatas, mantido entre execuções")
+    score.add_argument('--dedup-max-entries', type=int, default=50000,
+                       help="Máximo de representantes de cluster guardados no índice")
+    score.add_argument('--cascade', action='store_true',
+                       help="Pontua primeiro com o estágio linear e só envia à BiLSTM os textos incertos")
+    score.add_argument('--cascade-band', type=float, nargs=2, default=[30, 70], metavar=('INICIO', 'FIM'),
+                       help="Faixa de score (0-100) do estágio linear que segue para a BiLSTM")
+    score.add_argument('--cascade-model', default=DEFAULT_CASCADE_PATH,
+                       help="Arquivo do estágio linear (treinado com os dados sintéticos se não existir)")
+    score.add_argument('--aggregation', choices=WINDOW_AGGREGATIONS, default='mean',
+                       help="Agregação dos scores das janelas no modo --chunked")
+    
+    serve = subparsers.add_parser('serve', help="Servidor HTTP local de inferência com micro-batching")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8080)
+    serve.add_argument('--max-batch-size', type=int, default=32, help="Máximo de textos por passagem do modelo")
+    serve.add_argument('--max-wait-ms', type=float, default=5,
+                       help="Tempo que o primeiro texto espera por outros antes de o lote seguir")
+    serve.add_argument('--max-queue', type=int, default=1024,
+                       help="Limite da fila; acima dele as requisições recebem 503")
+    serve.add_argument('--timeout', type=float, default=30.0, help="Tempo limite por requisição (segundos)")
+    serve.add_argument('--cache-size', type=int, default=4096,
+                       help="Entradas do cache de resultados em memória (0 desativa o cache)")
+    serve.add_argument('--cache-db', help="Arquivo SQLite do cache persistente de resultados")
+    serve.add_argument('--no-metrics', action='store_true', help="Desativa a medição de tempo por etapa")
+    
+    train = subparsers.add_parser('train', help="Treina o modelo com um corpus rotulado (CSV, JSONL ou Parquet)")
+    train.add_argument('sources', nargs='*', help="Arquivos, diretórios ou padrões glob com os shards de treino")
+    train.add_argument('--text-field', default='text', help="Coluna/campo com o texto")
+    train.add_argument('--label-field', default='label', help="Coluna/campo com o rótulo (1/ia = IA, 0/humano = humano)")
+    train.add_argument('--epochs', type=int, help="Número de épocas (padrão: o da configuração do modelo)")
+    train.add_argument('--batch-size', type=int, default=64)
+    train.add_argument('--shuffle-buffer', type=int, default=10000,
+                       help="Registros no buffer de embaralhamento (limita a memória usada)")
+    train.add_argument('--checkpoint-dir',
+                       help="Diretório de checkpoints; repetir o comando com ele retoma um treino interrompido")
+    train.add_argument('--checkpoint-every', type=int,
+                       help="Salva o checkpoint a cada N lotes (padrão: a cada época)")
+    train.add_argument('--seed', type=int, help="Semente do embaralhamento")
+    train.add_argument('--store',
+                       help="Diretório de um corpus pré-tokenizado: criado a partir dos arquivos no primeiro "
+                            "treino e reutilizado (sem tokenizar de novo) nos seguintes")
+    train.add_argument('--id-field', default='id', help="Coluna/campo com o identificador (com --store)")
+    
+    store = subparsers.add_parser('store', help="Cria ou amplia um corpus pré-tokenizado com o vocabulário do modelo")
+    store.add_argument('store', help="Diretório do store")
+    store.add_argument('sources', nargs='+', help="Arquivos, diretórios ou padrões glob (CSV, JSONL ou Parquet)")
+    store.add_argument('--text-field', default='text', help="Coluna/campo com o texto")
+    store.add_argument('--label-field', default='label', help="Coluna/campo com o rótulo (opcional nos registros)")
+    store.add_argument('--id-field', default='id', help="Coluna/campo com o identificador")
+    store.add_argument('--rebuild', action='store_true', help="Recria o store mesmo com o vocabulário atual")
+    
+    cascade = subparsers.add_parser('cascade',
+                                    help="Treina o estágio linear da cascata ou avalia acurácia x vazão")
+    cascade.add_argument('action', choices=('train', 'eval'))
+    cascade.add_argument('sources', nargs='+', help="Arquivos rotulados (CSV, JSONL ou Parquet), diretórios ou globs")
+    cascade.add_argument('--text-field', default='text', help="Coluna/campo com o texto")
+    cascade.add_argument('--label-field', default='label', help="Coluna/campo com o rótulo (1/ia = IA, 0/humano = humano)")
+    cascade.add_argument('--limit', type=int, help="Máximo de registros lidos")
+    cascade.add_argument('--cascade-model', default=DEFAULT_CASCADE_PATH, help="Arquivo do estágio linear")
+    cascade.add_argument('--epochs', type=int, default=10, help="Épocas do treino do estágio linear")
+    cascade.add_argument('--bands', nargs='+', default=['30:70', '40:60', '20:80'],
+                         help="Faixas de escalonamento avaliadas (início:fim)")
+    cascade.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    cascade.add_argument('-o', '--output', help="Arquivo JSON com o resultado da avaliação")
+    
+    bench = subparsers.add_parser('bench', help="Benchmarks de inicialização, latência, vazão e memória")
+    bench.add_argument('-o', '--output', help="Arquivo JSON de saída (padrão: saída padrão)")
+    bench.add_argument('--repeat', type=int, default=50, help="Repetições por medição de latência")
+    bench.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32, 128])
+    bench.add_argument('--seed', type=int, default=1234, help="Semente das entradas sintéticas")
+    bench.add_argument('--skip-cold-start', action='store_true', help="Não mede a inicialização a frio")
+    bench.add_argument('--baseline', help="JSON de uma execução anterior para comparação")
+    bench.add_argument('--max-regression', type=float, default=0.10,
+                       help="Piora relativa máxima tolerada frente à baseline (0.10 = 10%%)")
+    
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    
+    if args.command == 'score':
+        run_score(args)
+    elif args.command == 'serve':
+        run_serve(args)
+    elif args.command == 'train':
+        run_train(args)
+    elif args.command == 'store':
+        run_store(args)
+    elif args.command == 'cascade':
+        run_cascade(args)
+    elif args.command == 'bench':
+        run_bench(args)
+    else:
+        run_gui()
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
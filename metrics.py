@@ -0,0 +1,155 @@
+import time
+import bisect
+import threading
+
+
+# Limites (em segundos) dos buckets dos histogramas, no estilo do Prometheus
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MetricsHook:
+    """Interface dos hooks de instrumentação; sobrescreva os métodos de interesse"""
+
+    def on_stage(self, stage, seconds, count):
+        """Chamado ao fim de cada etapa com sua duração e o número de itens processados"""
+
+    def on_value(self, name, value):
+        """Chamado com valores pontuais, como loss e acurácia de cada época de treino"""
+
+
+class _StageTimer:
+    __slots__ = ('instrumentation', 'stage', 'count', 'started')
+
+    def __init__(self, instrumentation, stage, count):
+        self.instrumentation = instrumentation
+        self.stage = stage
+        self.count = count
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.instrumentation.record_stage(self.stage, time.perf_counter() - self.started, self.count)
+        return False
+
+
+class Instrumentation:
+    """Distribui medições de etapas e valores para os hooks registrados
+
+    Use `with instrumentation.stage('predict', count=n): ...` para medir uma
+    etapa. Hooks podem ser instâncias de `MetricsHook` ou funções
+    `(etapa, segundos, itens)`.
+    """
+
+    def __init__(self, hooks=()):
+        self.hooks = []
+        for hook in hooks:
+            self.add_hook(hook)
+
+    def add_hook(self, hook):
+        if not isinstance(hook, MetricsHook):
+            function = hook
+            hook = MetricsHook()
+            hook.on_stage = function
+        self.hooks.append(hook)
+        return hook
+
+    def stage(self, name, count=1):
+        return _StageTimer(self, name, count)
+
+    def record_stage(self, name, seconds, count=1):
+        for hook in self.hooks:
+            hook.on_stage(name, seconds, count)
+
+    def record_value(self, name, value):
+        for hook in self.hooks:
+            hook.on_value(name, value)
+
+
+class HistogramAggregator(MetricsHook):
+    """Hook que acumula, em memória, um histograma de duração e a contagem de itens por etapa"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._stages = {}
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def on_stage(self, stage, seconds, count):
+        with self._lock:
+            data = self._stages.get(stage)
+            if data is None:
+                data = self._stages[stage] = {
+                    'calls': 0, 'items': 0, 'seconds': 0.0, 'buckets': [0] * (len(self.buckets) + 1)
+                }
+            data['calls'] += 1
+            data['items'] += count
+            data['seconds'] += seconds
+            data['buckets'][bisect.bisect_left(self.buckets, seconds)] += 1
+
+    def on_value(self, name, value):
+        with self._lock:
+            self._values[name] = value
+
+    def quantile(self, stage, q):
+        """Estimativa do quantil `q` (0-1) da duração de uma etapa, pelo limite superior do bucket"""
+        with self._lock:
+            data = self._stages.get(stage)
+            if not data or not data['calls']:
+                return 0.0
+            target = q * data['calls']
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float('inf'),), data['buckets']):
+                cumulative += bucket
+                if cumulative >= target:
+                    return bound
+        return float('inf')
+
+    def summary(self):
+        """Resumo serializável em JSON: chamadas, itens, tempo total/médio e p50/p95 por etapa"""
+        with self._lock:
+            stages = {name: dict(data) for name, data in self._stages.items()}
+            values = dict(self._values)
+
+        summary = {'stages': {}, 'values': values}
+        for name, data in sorted(stages.items()):
+            summary['stages'][name] = {
+                'calls': data['calls'],
+                'items': data['items'],
+                'total_seconds': data['seconds'],
+                'mean_ms': 1000 * data['seconds'] / data['calls'],
+                'p50_ms': 1000 * self.quantile(name, 0.5),
+                'p95_ms': 1000 * self.quantile(name, 0.95),
+            }
+        return summary
+
+    def to_prometheus(self, prefix='ai_detector'):
+        """Exporta os histogramas e valores no formato de texto do Prometheus"""
+        with self._lock:
+            stages = {name: dict(data, buckets=list(data['buckets'])) for name, data in self._stages.items()}
+            values = dict(self._values)
+
+        lines = [
+            f"# HELP {prefix}_stage_seconds Duração de cada etapa da análise",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for name, data in sorted(stages.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, data['buckets']):
+                cumulative += bucket
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {data["calls"]}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {data["seconds"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {data["calls"]}')
+
+        lines.append(f"# HELP {prefix}_stage_items_total Itens processados por etapa")
+        lines.append(f"# TYPE {prefix}_stage_items_total counter")
+        for name, data in sorted(stages.items()):
+            lines.append(f'{prefix}_stage_items_total{{stage="{name}"}} {data["items"]}')
+
+        for name, value in sorted(values.items()):
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+
+        return '\n'.join(lines) + '\n'
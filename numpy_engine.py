@@ -0,0 +1,154 @@
+import numpy as np
+
+
+# Ativações suportadas nas camadas Dense exportadas
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'sigmoid': lambda x: 0.5 * (1 + np.tanh(0.5 * x)),
+}
+
+
+def extract_weights(model):
+    """Extrai os pesos do modelo `Sequential` do detector como dicionário de arrays
+
+    Suporta Embedding, Bidirectional(LSTM), GlobalMaxPooling1D, Dense e
+    Dropout (ignorado, pois não atua na inferência). Qualquer outra camada
+    gera `ValueError`, para não exportar um modelo que o motor não reproduz.
+    """
+    arrays = {}
+    activations = []
+
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind == 'Embedding':
+            arrays['embedding'] = layer.get_weights()[0]
+            arrays['mask_zero'] = np.array(bool(layer.mask_zero))
+        elif kind == 'Bidirectional':
+            for name, lstm in (('forward', layer.forward_layer), ('backward', layer.backward_layer)):
+                if type(lstm).__name__ != 'LSTM' or not lstm.return_sequences:
+                    raise ValueError(f"Camada recorrente não suportada: {type(lstm).__name__}")
+                if lstm.activation.__name__ != 'tanh' or lstm.recurrent_activation.__name__ != 'sigmoid':
+                    raise ValueError("Apenas LSTM com ativações tanh/sigmoid é suportada")
+                kernel, recurrent_kernel, bias = lstm.get_weights()
+                arrays[f'{name}_kernel'] = kernel
+                arrays[f'{name}_recurrent_kernel'] = recurrent_kernel
+                arrays[f'{name}_bias'] = bias
+            if layer.merge_mode != 'concat':
+                raise ValueError(f"merge_mode não suportado: {layer.merge_mode}")
+        elif kind == 'Dense':
+            kernel, bias = layer.get_weights()
+            arrays[f'dense_{len(activations)}_kernel'] = kernel
+            arrays[f'dense_{len(activations)}_bias'] = bias
+            activations.append(layer.activation.__name__)
+        elif kind not in ('GlobalMaxPooling1D', 'Dropout', 'InputLayer'):
+            raise ValueError(f"Camada não suportada pelo motor NumPy: {kind}")
+
+    unsupported = set(activations) - set(ACTIVATIONS)
+    if unsupported:
+        raise ValueError(f"Ativação não suportada: {', '.join(sorted(unsupported))}")
+
+    arrays['dense_activations'] = np.array(activations)
+    return arrays
+
+
+def export_weights(model, path):
+    """Grava os pesos de `extract_weights` num `.npz` compacto, lido por `NumpyBiLSTM.load`"""
+    with open(path, 'wb') as file:
+        np.savez(file, **extract_weights(model))
+
+
+class NumpyBiLSTM:
+    """Passagem direta do modelo do detector apenas com NumPy
+
+    Reproduz Embedding -> Bidirectional(LSTM) -> GlobalMaxPooling1D -> Dense
+    (com os pesos de `export_weights`), vetorizada na dimensão do lote. Na
+    carga, embedding, kernel e bias de cada direção viram uma tabela
+    (vocabulário x 4·unidades) com a projeção de entrada já calculada, e as
+    duas direções avançam juntas num único `matmul` por passo de tempo. As
+    portas sigmoide são escritas como tanh(x/2), o que permite uma única
+    tanh por passo para as quatro portas.
+
+    Com `mask_zero` (Embedding com máscara), o id 0 é padding: nesses passos
+    o estado da LSTM é mantido e a saída é zero, como no Keras. Assim o
+    resultado não depende de quanto padding há após o texto, desde que haja
+    algum (o GlobalMaxPooling1D do Keras ignora a máscara e inclui esses
+    zeros no máximo).
+    """
+
+    def __init__(self, weights):
+        self.units = weights['forward_recurrent_kernel'].shape[0]
+        self.mask_zero = bool(weights['mask_zero']) if 'mask_zero' in weights else False
+        units = self.units
+
+        # Colunas das portas i, f, o (ordem do Keras: i, f, c, o) escaladas por 1/2
+        scale = np.full(4 * units, 0.5, dtype=np.float32)
+        scale[2 * units:3 * units] = 1.0
+
+        embedding = weights['embedding'].astype(np.float32)
+        self.input_tables = np.stack([
+            (embedding @ weights[f'{name}_kernel'] + weights[f'{name}_bias']) * scale
+            for name in ('forward', 'backward')
+        ]).astype(np.float32)
+        self.recurrent_kernels = np.stack([
+            weights[f'{name}_recurrent_kernel'] * scale for name in ('forward', 'backward')
+        ]).astype(np.float32)
+
+        self.dense = [
+            (
+                weights[f'dense_{i}_kernel'].astype(np.float32),
+                weights[f'dense_{i}_bias'].astype(np.float32),
+                ACTIVATIONS[str(activation)]
+            )
+            for i, activation in enumerate(weights['dense_activations'])
+        ]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as weights:
+            return cls(weights)
+
+    def _pooled_states(self, padded):
+        """Máximo, ao longo do tempo, das saídas das duas direções (lote x 2·unidades)"""
+        count, steps = padded.shape
+        units = self.units
+
+        # Projeções de entrada de todos os passos: (direção, tempo, lote, 4·unidades)
+        ids = np.ascontiguousarray(padded.T)
+        inputs = np.stack([self.input_tables[0][ids], self.input_tables[1][ids[::-1]]])
+        if self.mask_zero:
+            masks = np.stack([ids, ids[::-1]])[..., None] != 0
+
+        hidden = np.zeros((2, count, units), dtype=np.float32)
+        cell = np.zeros((2, count, units), dtype=np.float32)
+        pooled = np.full((2, count, units), -np.inf, dtype=np.float32)
+
+        for t in range(steps):
+            gates = np.tanh(inputs[:, t] + np.matmul(hidden, self.recurrent_kernels))
+            input_gate = 0.5 * (1 + gates[..., :units])
+            forget_gate = 0.5 * (1 + gates[..., units:2 * units])
+            output_gate = 0.5 * (1 + gates[..., 3 * units:])
+
+            new_cell = forget_gate * cell + input_gate * gates[..., 2 * units:3 * units]
+            new_hidden = output_gate * np.tanh(new_cell)
+
+            if self.mask_zero:
+                mask = masks[:, t]
+                cell = np.where(mask, new_cell, cell)
+                hidden = np.where(mask, new_hidden, hidden)
+                np.maximum(pooled, np.where(mask, new_hidden, 0), out=pooled)
+            else:
+                cell, hidden = new_cell, new_hidden
+                np.maximum(pooled, hidden, out=pooled)
+
+        return np.concatenate([pooled[0], pooled[1]], axis=1)
+
+    def predict(self, padded):
+        """Probabilidade (0-1) de cada linha de uma matriz int32 (lote x comprimento qualquer)"""
+        if not len(padded):
+            return np.zeros(0, dtype=np.float32)
+
+        outputs = self._pooled_states(np.asarray(padded))
+        for kernel, bias, activation in self.dense:
+            outputs = activation(outputs @ kernel + bias)
+        return outputs[:, 0]
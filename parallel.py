@@ -0,0 +1,185 @@
+import os
+import sys
+import multiprocessing
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from main import AITextDetectorML, DEFAULT_ARTIFACT_DIR, DEFAULT_BATCH_SIZE, DEFAULT_LENGTH_BUCKETS, batched, score_batch
+from cache import ResultCache
+
+
+# Variáveis que limitam as threads de BLAS/OpenMP usadas pelo NumPy (e pelo TensorFlow na CPU)
+BLAS_THREAD_VARIABLES = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+
+# Detector carregado uma única vez por processo worker (em `_init_worker`)
+_worker_detector = None
+
+
+def _init_worker(artifact_dir, intra_op_threads, inter_op_threads, use_compiled, engine, length_buckets, cache_size):
+    """Inicializador de cada worker: ajusta as threads do TensorFlow (se usado) e carrega o modelo salvo"""
+    global _worker_detector
+    # A saída padrão do pai pode ser o JSONL de resultados; mensagens dos workers vão para stderr
+    sys.stdout = sys.stderr
+    if engine == 'tensorflow':
+        import tensorflow as tf
+
+        # Precisa acontecer antes da primeira operação do TensorFlow no processo
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+    cache = ResultCache(cache_size) if cache_size > 0 else None
+    _worker_detector = AITextDetectorML(
+        artifact_dir=artifact_dir, use_compiled=use_compiled, cache=cache, engine=engine,
+        length_buckets=length_buckets
+    )
+
+
+def _score_chunk(chunk, include_report, chunked, aggregation):
+    return score_batch(_worker_detector, chunk, include_report, chunked, aggregation)
+
+
+class ParallelScorer:
+    """Distribui a pontuação de um fluxo de registros entre vários processos
+
+    Cada worker carrega o modelo persistido uma vez no inicializador, usa até
+    `intra_op_threads` threads de BLAS (motor NumPy) ou do TensorFlow, e pontua
+    blocos de `chunk_size` registros. Os resultados saem na ordem da entrada e
+    no máximo `workers * 2` blocos ficam em andamento, então a memória não
+    cresce com o tamanho da entrada.
+
+    Se um worker morrer, o pool é recriado e o bloco mais antigo pendente é
+    repetido sozinho; um bloco que derruba o worker mais de `max_retries`
+    vezes é emitido com erro em cada registro, e o restante segue normalmente.
+    Se o pool precisar ser recriado mais de `max_pool_restarts` vezes seguidas
+    sem nenhum bloco concluído (por exemplo, quando o inicializador falha), a
+    pontuação é interrompida.
+    """
+
+    def __init__(self, artifact_dir=DEFAULT_ARTIFACT_DIR, workers=None, chunk_size=DEFAULT_BATCH_SIZE,
+                 intra_op_threads=1, inter_op_threads=1, use_compiled=True, engine='numpy',
+                 length_buckets=DEFAULT_LENGTH_BUCKETS, cache_size=0,
+                 include_report=False, chunked=False, aggregation='mean', max_retries=2, max_pool_restarts=10):
+        self.artifact_dir = artifact_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.max_in_flight = self.workers * 2
+        self.max_retries = max_retries
+        self.max_pool_restarts = max_pool_restarts
+        self.chunk_options = (include_report, chunked, aggregation)
+        self._initargs = (
+            artifact_dir, intra_op_threads, inter_op_threads, use_compiled, engine, length_buckets, cache_size
+        )
+
+        self.chunks_done = 0
+        self.pool_restarts = 0
+        self.consecutive_restarts = 0
+        self.failed_chunks = 0
+
+        # Treina e salva o artefato aqui, se preciso, para que os workers apenas o carreguem
+        AITextDetectorML(artifact_dir=artifact_dir, engine=engine)
+
+        self._pool = None
+        self._start_pool()
+
+    def _start_pool(self):
+        # As bibliotecas de BLAS leem o limite ao serem carregadas, antes do inicializador; por isso
+        # ele vai no ambiente herdado pelos workers (no pai, que já carregou o NumPy, não tem efeito)
+        os.environ.update({name: str(self._initargs[1]) for name in BLAS_THREAD_VARIABLES})
+        # 'spawn' evita herdar o estado do TensorFlow do processo pai, que não é seguro com fork
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=self._initargs
+        )
+
+    def _restart_pool(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.pool_restarts += 1
+        self.consecutive_restarts += 1
+        if self.consecutive_restarts > self.max_pool_restarts:
+            raise RuntimeError(
+                f"Workers encerrados {self.consecutive_restarts} vezes seguidas sem concluir nenhum bloco; "
+                "verifique o artefato do modelo e a memória disponível"
+            )
+        self._start_pool()
+
+    def _submit(self, entry):
+        entry['future'] = self._pool.submit(_score_chunk, entry['chunk'], *self.chunk_options)
+
+    def score(self, records, offset=0):
+        """Gera um dicionário de resultado por registro, na ordem da entrada
+
+        `records` é um iterável de (id, texto, erro), como o de `iter_records`.
+        """
+        indexed = enumerate(islice(records, offset, None), offset)
+        chunks = batched(indexed, self.chunk_size)
+        pending = deque()
+        recovering = False
+
+        while True:
+            # Mantém a fila de blocos em andamento cheia (durante a recuperação, só enfileira)
+            for chunk in islice(chunks, self.max_in_flight - len(pending)):
+                entry = {'chunk': chunk, 'future': None, 'attempts': 0}
+                if not recovering:
+                    self._submit(entry)
+                pending.append(entry)
+
+            if not pending:
+                return
+
+            head = pending[0]
+            if head['future'] is None:
+                self._submit(head)
+
+            try:
+                results = head['future'].result()
+            except BrokenProcessPool:
+                head['attempts'] += 1
+                self._restart_pool()
+                for entry in pending:
+                    entry['future'] = None
+                recovering = True
+
+                if head['attempts'] > self.max_retries:
+                    pending.popleft()
+                    self.failed_chunks += 1
+                    yield from self._error_results(head['chunk'], "Worker encerrado inesperadamente")
+                continue
+            except Exception as e:
+                # O bloco chegou a rodar num worker, então o pool em si está funcionando
+                self.consecutive_restarts = 0
+                pending.popleft()
+                self.failed_chunks += 1
+                yield from self._error_results(head['chunk'], f"Erro no worker: {str(e)}")
+                continue
+
+            pending.popleft()
+            self.chunks_done += 1
+            self.consecutive_restarts = 0
+
+            if recovering:
+                recovering = False
+                for entry in pending:
+                    if entry['future'] is None:
+                        self._submit(entry)
+
+            yield from results
+
+    @staticmethod
+    def _error_results(chunk, message):
+        for index, (record_id, _, _) in chunk:
+            yield {'offset': index, 'id': record_id, 'error': message}
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'chunks_done': self.chunks_done,
+            'failed_chunks': self.failed_chunks,
+            'pool_restarts': self.pool_restarts,
+        }
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,304 @@
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 5
+DEFAULT_MAX_QUEUE = 1024
+DEFAULT_TIMEOUT = 30.0
+
+# Tamanho máximo aceito para o corpo de uma requisição
+MAX_BODY_BYTES = 1024 * 1024
+
+HTTP_REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+    504: 'Gateway Timeout',
+}
+
+
+class QueueFullError(Exception):
+    """A fila de análises atingiu o limite; o cliente deve tentar de novo mais tarde"""
+
+
+class MicroBatcher:
+    """Agrupa requisições concorrentes numa única passagem pelo modelo
+
+    Os textos entram numa fila limitada (`max_queue`, que dá a contrapressão).
+    Um laço consome a fila e junta o que chegar em até `max_wait_ms` após o
+    primeiro item, ou até `max_batch_size` textos, e chama `analyze_texts`
+    uma vez por lote numa thread dedicada, sem bloquear o event loop.
+    """
+
+    def __init__(self, detector, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 max_queue=DEFAULT_MAX_QUEUE):
+        self.detector = detector
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self._task = None
+
+        self.batches = 0
+        self.batched_items = 0
+        self.largest_batch = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def submit(self, text, timeout=DEFAULT_TIMEOUT):
+        """Enfileira um texto e aguarda o resultado de `analyze_text` para ele"""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((text, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError()
+
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Requisições que já expiraram ou foram canceladas não entram no lote
+        return [(text, future) for text, future in batch if not future.done()]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+
+            texts = [text for text, _ in batch]
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.detector.analyze_texts, texts, len(texts)
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.batched_items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue.qsize(),
+            'queue_capacity': self.queue.maxsize,
+            'batches': self.batches,
+            'batched_items': self.batched_items,
+            'mean_batch_size': self.batched_items / self.batches if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+        }
+
+
+class InferenceServer:
+    """Servidor HTTP mínimo (asyncio) que expõe o detector como serviço
+
+    Rotas:
+    • POST /analyze  {"text": "...", "include_report": false}
+    • GET  /health   estado e versão do modelo
+    • GET  /metrics  contadores do servidor, do micro-batching, do cache e das etapas
+    • GET  /metrics/prometheus  tempos por etapa no formato de texto do Prometheus
+
+    `aggregator` é o `HistogramAggregator` ligado à instrumentação do detector, se houver.
+    """
+
+    def __init__(self, detector, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=DEFAULT_TIMEOUT, aggregator=None,
+                 **batcher_options):
+        self.detector = detector
+        self.aggregator = aggregator
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.batcher_options = batcher_options
+        self.batcher = None
+        self.started_at = time.time()
+
+        self.requests = 0
+        self.responses = {}
+        self.latency_total = 0.0
+
+    async def serve_forever(self):
+        self.batcher = MicroBatcher(self.detector, **self.batcher_options)
+        self.batcher.start()
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        print(f"Servidor ouvindo em http://{self.host}:{self.port}")
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                started = time.perf_counter()
+                status, payload = await self._dispatch(method, path, body)
+                self._record(status, time.perf_counter() - started)
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self._write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as e:
+            await self._write_response(writer, 400, {'error': str(e)}, keep_alive=False)
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        """Lê uma requisição HTTP/1.1; retorna None quando o cliente fecha a conexão"""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+
+        try:
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise ValueError("Linha de requisição inválida")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length', 0) or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Corpo da requisição grande demais")
+        body = await reader.readexactly(length) if length else b''
+
+        return method.upper(), path.split('?', 1)[0], headers, body
+
+    async def _dispatch(self, method, path, body):
+        if path == '/health':
+            return 200, {'status': 'ok', 'model_version': self.detector.model_version}
+        if path == '/metrics':
+            return 200, self.metrics()
+        if path == '/metrics/prometheus':
+            if self.aggregator is None:
+                return 404, {'error': "Instrumentação desativada"}
+            return 200, self.aggregator.to_prometheus()
+        if path != '/analyze':
+            return 404, {'error': "Rota não encontrada"}
+        if method != 'POST':
+            return 405, {'error': "Use POST"}
+
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            return 400, {'error': "JSON inválido"}
+        if not isinstance(request, dict) or not isinstance(request.get('text'), str):
+            return 400, {'error': "Campo 'text' ausente"}
+
+        try:
+            ai_probability, suspicious_parts, report = await self.batcher.submit(request['text'], self.timeout)
+        except QueueFullError:
+            return 503, {'error': "Servidor sobrecarregado, tente novamente"}
+        except asyncio.TimeoutError:
+            return 504, {'error': "Tempo limite da análise excedido"}
+        except Exception as e:
+            return 500, {'error': f"Erro durante análise: {str(e)}"}
+
+        result = {'ai_probability': round(ai_probability, 4), 'suspicious_parts': suspicious_parts}
+        if request.get('include_report'):
+            result['report'] = report
+        return 200, result
+
+    async def _write_response(self, writer, status, payload, keep_alive):
+        if isinstance(payload, str):
+            body = payload.encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+        head = (
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    def _record(self, status, elapsed):
+        self.requests += 1
+        self.responses[status] = self.responses.get(status, 0) + 1
+        self.latency_total += elapsed
+
+    def metrics(self):
+        metrics = {
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'requests': self.requests,
+            'responses': {str(status): count for status, count in sorted(self.responses.items())},
+            'mean_latency_ms': 1000 * self.latency_total / self.requests if self.requests else 0.0,
+            'batching': self.batcher.stats(),
+        }
+        if self.detector.cache is not None:
+            metrics['cache'] = self.detector.cache.stats()
+        if self.aggregator is not None:
+            metrics['stages'] = self.aggregator.summary()['stages']
+        return metrics
+
+
+def serve(detector, host=DEFAULT_HOST, port=DEFAULT_PORT, **options):
+    """Executa o servidor até ser interrompido (Ctrl+C)"""
+    try:
+        asyncio.run(InferenceServer(detector, host, port, **options).serve_forever())
+    except KeyboardInterrupt:
+        pass
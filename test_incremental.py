@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from main import TextStats
+from incremental import split_paragraphs
+
+
+def combined_stats(text):
+    parts = [(offset, TextStats(paragraph)) for offset, paragraph in split_paragraphs(text)]
+    return TextStats.combine(parts, text)
+
+
+@pytest.mark.parametrize('text', [
+    "Introdução\n\nEste texto começa com um título. Depois vem outra frase!\n\nE um parágrafo final?",
+    "Título\n\nSubtítulo\n\nPrimeira frase do corpo. Segunda frase.",
+    "Parágrafo sem ponto no fim\n\n... começa com reticências. Fim.",
+    "Primeiro parágrafo. Termina aqui.\n\nSegundo parágrafo sem pontuação",
+])
+def test_combine_matches_whole_text(text):
+    combined, whole = combined_stats(text), TextStats(text)
+    assert combined.sentences == whole.sentences
+    assert combined.sentence_words == whole.sentence_words
+    assert combined.sentence_starts == whole.sentence_starts
+    assert np.array_equal(combined.sentence_lengths, whole.sentence_lengths)
+    assert combined.word_spans == whole.word_spans
+
+
+def test_heading_without_punctuation_joins_next_sentence():
+    text = "Introdução\n\nEste documento descreve o sistema. Ele tem duas partes. A segunda é curta."
+    assert combined_stats(text).sentence_count == TextStats(text).sentence_count == 3
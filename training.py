@@ -0,0 +1,399 @@
+import os
+import csv
+import glob
+import json
+import shutil
+from itertools import repeat
+
+import numpy as np
+
+
+# Formatos de shard aceitos, pela extensão do arquivo
+SHARD_EXTENSIONS = ('.jsonl', '.csv', '.parquet')
+
+DEFAULT_TRAIN_BATCH_SIZE = 64
+DEFAULT_SHUFFLE_BUFFER = 10000
+DEFAULT_PARALLEL_READS = 4
+
+# Linhas lidas por vez de arquivos CSV e Parquet
+READ_CHUNK_ROWS = 10000
+
+# Arquivos mantidos em `checkpoint_dir` para retomar um treino interrompido
+CHECKPOINT_VOCABULARY_FILE = 'tokenizer.json'
+CHECKPOINT_STATE_FILE = 'corpus.json'
+CHECKPOINT_BACKUP_DIR = 'backup'
+
+LABEL_NAMES = {'1': 1, 'true': 1, 'ai': 1, 'ia': 1, '0': 0, 'false': 0, 'human': 0, 'humano': 0}
+
+
+def expand_sources(sources):
+    """Resolve arquivos, diretórios e padrões glob numa lista ordenada de shards"""
+    shards = []
+    for source in sources:
+        if os.path.isdir(source):
+            shards.extend(
+                os.path.join(source, name) for name in sorted(os.listdir(source))
+                if name.lower().endswith(SHARD_EXTENSIONS)
+            )
+        elif any(char in source for char in '*?['):
+            shards.extend(sorted(glob.glob(source)))
+        else:
+            shards.append(source)
+
+    for shard in shards:
+        if not shard.lower().endswith(SHARD_EXTENSIONS):
+            raise ValueError(f"Formato não suportado: {shard} (use {', '.join(SHARD_EXTENSIONS)})")
+        if not os.path.isfile(shard):
+            raise ValueError(f"Arquivo não encontrado: {shard}")
+    if not shards:
+        raise ValueError("Nenhum arquivo de treino encontrado")
+    return shards
+
+
+def parse_label(value):
+    """Converte o rótulo de um registro em 1 (IA) ou 0 (humano); None se inválido"""
+    if isinstance(value, (bool, np.bool_)):
+        return int(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value) if value in (0, 1) else None
+    if isinstance(value, str):
+        return LABEL_NAMES.get(value.strip().lower())
+    return None
+
+
+def _iter_jsonl_rows(path, fields):
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield (None,) * len(fields)
+                continue
+            if isinstance(record, dict):
+                yield tuple(record.get(field) for field in fields)
+            else:
+                yield (None,) * len(fields)
+
+
+def _iter_csv_rows(path, fields):
+    try:
+        import pandas as pd
+    except ImportError:
+        # Sem pandas, lê com o módulo csv da biblioteca padrão
+        with open(path, 'r', encoding='utf-8', newline='') as file:
+            for row in csv.DictReader(file):
+                yield tuple(row.get(field) for field in fields)
+        return
+
+    for chunk in pd.read_csv(path, usecols=lambda column: column in fields, chunksize=READ_CHUNK_ROWS,
+                             dtype={fields[0]: str}, keep_default_na=False):
+        columns = [chunk[field] if field in chunk else repeat(None) for field in fields]
+        yield from zip(*columns)
+
+
+def _iter_parquet_rows(path, fields):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Leitura de Parquet requer o pacote 'pyarrow' (pip install pyarrow)")
+
+    parquet = pq.ParquetFile(path)
+    present = [field for field in dict.fromkeys(fields) if field in parquet.schema_arrow.names]
+    for batch in parquet.iter_batches(batch_size=READ_CHUNK_ROWS, columns=present):
+        columns = batch.to_pydict()
+        yield from zip(*[columns.get(field, repeat(None)) for field in fields])
+
+
+def iter_rows(path, fields):
+    """Lê um shard aos poucos e gera uma tupla com os valores de `fields` por registro
+
+    O primeiro campo é lido como texto; campos ausentes (ou registros
+    inválidos) geram None.
+    """
+    lower = path.lower()
+    if lower.endswith('.csv'):
+        return _iter_csv_rows(path, fields)
+    if lower.endswith('.parquet'):
+        return _iter_parquet_rows(path, fields)
+    return _iter_jsonl_rows(path, fields)
+
+
+def iter_labeled_records(path, text_field='text', label_field='label'):
+    """Lê um shard aos poucos e gera (texto, rótulo) ou (None, None) para registros inválidos"""
+    for text, label in iter_rows(path, (text_field, label_field)):
+        label = parse_label(label)
+        if not isinstance(text, str) or not text.strip() or label is None:
+            yield None, None
+        else:
+            yield text, label
+
+
+def _filters_pattern(filters):
+    """Classe de caracteres RE2 equivalente aos filtros do Tokenizer do Keras"""
+    escapes = {'\t': '\\t', '\n': '\\n', '\r': '\\r'}
+    return '[' + ''.join(escapes.get(char, '\\' + char) for char in filters) + ']'
+
+
+class StreamingTrainer:
+    """Treina o modelo do detector a partir de um corpus rotulado grande, sem carregá-lo na memória
+
+    Os shards (CSV, JSONL ou Parquet, com colunas `text_field` e
+    `label_field`) são lidos em duas etapas:
+
+    1. Uma passagem em fluxo ajusta o vocabulário do tokenizer, contando
+       palavras texto a texto (a memória cresce com o vocabulário, não com o
+       corpus).
+    2. O treino lê os shards intercalados num pipeline `tf.data`, com
+       embaralhamento num buffer limitado (`shuffle_buffer`), lotes de
+       `batch_size`, tokenização em paralelo dentro do grafo e prefetch.
+
+    Com `checkpoint_dir`, o vocabulário e o estado do treino (a cada época,
+    ou a cada `checkpoint_every` lotes) ficam salvos ali; repetir o mesmo
+    comando após uma interrupção retoma do último checkpoint. Ao terminar
+    com sucesso, esses arquivos são removidos.
+
+    A tokenização do grafo reproduz a do `FastTokenizer` usado na inferência,
+    exceto em casos raros de minúsculas Unicode, em que `tf.strings.lower`
+    e `str.lower` divergem.
+    """
+
+    def __init__(self, sources, text_field='text', label_field='label', epochs=None,
+                 batch_size=DEFAULT_TRAIN_BATCH_SIZE, shuffle_buffer=DEFAULT_SHUFFLE_BUFFER,
+                 checkpoint_dir=None, checkpoint_every=None, parallel_reads=DEFAULT_PARALLEL_READS, seed=None):
+        self.shards = self._expand(sources)
+        self.text_field = text_field
+        self.label_field = label_field
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.shuffle_buffer = shuffle_buffer
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_every = checkpoint_every
+        self.parallel_reads = parallel_reads
+        self.seed = seed
+
+        self.samples = 0
+        self.skipped = 0
+
+    def _expand(self, sources):
+        return expand_sources(sources)
+
+    def _file_count(self):
+        return len(self.shards)
+
+    def _iter_texts(self):
+        for shard in self.shards:
+            for text, label in iter_labeled_records(shard, self.text_field, self.label_field):
+                if text is None:
+                    self.skipped += 1
+                else:
+                    yield text
+
+    def _checkpoint_path(self, name):
+        return os.path.join(self.checkpoint_dir, name)
+
+    def fit_vocabulary(self, detector):
+        """Ajusta o tokenizer do detector numa única passagem em fluxo pelo corpus
+
+        Retoma o vocabulário salvo em `checkpoint_dir`, se houver, para que
+        os pesos do checkpoint continuem valendo.
+        """
+        from tensorflow import keras
+
+        if self.checkpoint_dir and os.path.isfile(self._checkpoint_path(CHECKPOINT_STATE_FILE)):
+            with open(self._checkpoint_path(CHECKPOINT_STATE_FILE), 'r', encoding='utf-8') as file:
+                state = json.load(file)
+            if state['shards'] == self.shards:
+                with open(self._checkpoint_path(CHECKPOINT_VOCABULARY_FILE), 'r', encoding='utf-8') as file:
+                    tokenizer = keras.preprocessing.text.tokenizer_from_json(file.read())
+                self.samples = state['samples']
+                self.skipped = state['skipped']
+                print(f"Vocabulário retomado de {self.checkpoint_dir}")
+                return tokenizer
+
+        tokenizer = detector._new_tokenizer()
+        self.skipped = 0
+        with detector._stage('train_tokenizer'):
+            tokenizer.fit_on_texts(self._iter_texts())
+        self.samples = tokenizer.document_count
+        if not self.samples:
+            raise ValueError("Nenhum registro válido nos arquivos de treino")
+
+        if self.checkpoint_dir:
+            # Pesos salvos com outro vocabulário não servem mais
+            shutil.rmtree(self._checkpoint_path(CHECKPOINT_BACKUP_DIR), ignore_errors=True)
+            os.makedirs(self.checkpoint_dir, exist_ok=True)
+            with open(self._checkpoint_path(CHECKPOINT_VOCABULARY_FILE), 'w', encoding='utf-8') as file:
+                file.write(tokenizer.to_json())
+            # O estado é escrito por último: sem ele, o vocabulário é ajustado de novo
+            with open(self._checkpoint_path(CHECKPOINT_STATE_FILE), 'w', encoding='utf-8') as file:
+                json.dump({'shards': self.shards, 'samples': self.samples, 'skipped': self.skipped}, file)
+        return tokenizer
+
+    def _read_shard(self, path):
+        for text, label in iter_labeled_records(path.decode('utf-8'), self.text_field, self.label_field):
+            if text is not None:
+                yield text, label
+
+    def build_dataset(self, vocabulary, oov_index, max_len, filters):
+        """Pipeline `tf.data` de (matriz int32 lote x max_len, rótulos) a partir dos shards"""
+        import tensorflow as tf
+
+        table = tf.lookup.StaticHashTable(
+            tf.lookup.KeyValueTensorInitializer(
+                tf.constant(list(vocabulary.keys()), dtype=tf.string),
+                tf.constant(list(vocabulary.values()), dtype=tf.int32)
+            ),
+            default_value=oov_index
+        )
+        pattern = _filters_pattern(filters)
+
+        def tokenize(texts, labels):
+            # Mesmo processo do FastTokenizer: minúsculas, filtros viram espaço, separação por ' '
+            texts = tf.strings.regex_replace(tf.strings.lower(texts, encoding='utf-8'), pattern, ' ')
+            words = tf.strings.split(texts, sep=' ')
+            words = tf.ragged.boolean_mask(words, tf.strings.length(words) > 0)
+            ids = tf.ragged.map_flat_values(table.lookup, words)
+            return ids.to_tensor(default_value=0, shape=[None, max_len]), labels
+
+        signature = (tf.TensorSpec(shape=(), dtype=tf.string), tf.TensorSpec(shape=(), dtype=tf.int32))
+        files = tf.data.Dataset.from_tensor_slices(self.shards)
+        if len(self.shards) > 1:
+            files = files.shuffle(len(self.shards), seed=self.seed, reshuffle_each_iteration=True)
+
+        dataset = files.interleave(
+            lambda path: tf.data.Dataset.from_generator(self._read_shard, args=(path,), output_signature=signature),
+            cycle_length=max(1, min(self.parallel_reads, len(self.shards))),
+            num_parallel_calls=tf.data.AUTOTUNE,
+            deterministic=False
+        )
+        return (
+            dataset
+            .shuffle(self.shuffle_buffer, seed=self.seed, reshuffle_each_iteration=True)
+            .batch(self.batch_size)
+            .map(tokenize, num_parallel_calls=tf.data.AUTOTUNE)
+            .prefetch(tf.data.AUTOTUNE)
+        )
+
+    def train(self, detector):
+        """Ajusta vocabulário e modelo do `detector` com o corpus (chamado por `AITextDetectorML`)"""
+        from tensorflow import keras
+        from fast_tokenizer import FastTokenizer
+
+        tokenizer = self.fit_vocabulary(detector)
+        vocabulary = FastTokenizer.from_keras(tokenizer, detector.max_len)
+        dataset = self.build_dataset(vocabulary.vocabulary, vocabulary.oov_index, detector.max_len,
+                                     tokenizer.filters)
+        print(f"Corpus: {self.samples} registros em {self._file_count()} arquivo(s), {self.skipped} ignorados")
+
+        model = detector._build_model()
+        # BackupAndRestore precisa de um modelo já construído para restaurar os pesos
+        model.build((None, detector.max_len))
+        callbacks = [keras.callbacks.LambdaCallback(
+            on_epoch_begin=detector._on_epoch_begin,
+            on_epoch_end=detector._on_epoch_end
+        )]
+        if self.checkpoint_dir:
+            callbacks.append(keras.callbacks.BackupAndRestore(
+                self._checkpoint_path(CHECKPOINT_BACKUP_DIR),
+                save_freq=self.checkpoint_every or 'epoch'
+            ))
+
+        epochs = self.epochs or detector.epochs
+        detector._fit_epochs = epochs
+        with detector._stage('train_fit', self.samples * epochs):
+            model.fit(dataset, epochs=epochs, verbose=0, callbacks=callbacks)
+
+        detector.tokenizer = tokenizer
+        detector.model = model
+        detector.training_info = {
+            'sources': self.shards,
+            'samples': self.samples,
+            'skipped': self.skipped,
+            'epochs': epochs,
+            'batch_size': self.batch_size,
+        }
+
+        if self.checkpoint_dir:
+            for name in (CHECKPOINT_STATE_FILE, CHECKPOINT_VOCABULARY_FILE):
+                if os.path.isfile(self._checkpoint_path(name)):
+                    os.remove(self._checkpoint_path(name))
+
+
+class StoreTrainer(StreamingTrainer):
+    """Treina a partir de um `CorpusStore`, lendo ids já tokenizados em vez de texto
+
+    Na primeira execução (store inexistente), o vocabulário é ajustado em
+    fluxo a partir de `sources`, como em `StreamingTrainer`, e o corpus é
+    tokenizado uma única vez para o store. Nas seguintes, o vocabulário é o
+    do store e só shards novos de `sources` são tokenizados e acrescentados;
+    retreinar sem mudar o corpus não relê nem tokeniza texto algum.
+
+    Os lotes saem direto do mapeamento em memória, numa permutação nova dos
+    documentos rotulados a cada época (por isso `shuffle_buffer` não se
+    aplica).
+    """
+
+    def __init__(self, store_dir, sources=(), id_field='id', **options):
+        self.store_dir = store_dir
+        self.id_field = id_field
+        self.store = None
+        super().__init__(sources, **options)
+
+    def _expand(self, sources):
+        # Sem shards novos, o corpus vem todo do store
+        return expand_sources(sources) if sources else []
+
+    def _file_count(self):
+        return len(self.store.metadata['sources'])
+
+    def fit_vocabulary(self, detector):
+        from tensorflow import keras
+        from corpus_store import CorpusStore
+
+        if CorpusStore.exists(self.store_dir):
+            self.store = CorpusStore(self.store_dir)
+            print(f"Vocabulário do store {self.store_dir}")
+        else:
+            if not self.shards:
+                raise ValueError(f"Store não encontrado em {self.store_dir}; informe os arquivos de treino")
+            self.store = CorpusStore.create(self.store_dir, super().fit_vocabulary(detector).to_json())
+
+        if self.shards:
+            with detector._stage('train_store'):
+                added = self.store.ingest(self.shards, self.text_field, self.label_field, self.id_field)
+            print(f"{added} documentos acrescentados ao store")
+
+        stats = self.store.stats()
+        self.samples = stats['labeled']
+        self.skipped = stats['documents'] - stats['labeled'] + stats['skipped']
+        if not self.samples:
+            raise ValueError("Nenhum documento rotulado no store")
+        return keras.preprocessing.text.tokenizer_from_json(self.store.tokenizer_json)
+
+    def build_dataset(self, vocabulary, oov_index, max_len, filters):
+        """Pipeline `tf.data` de (matriz int32 lote x max_len, rótulos) lidos do store"""
+        import tensorflow as tf
+
+        store = self.store
+        labeled = np.flatnonzero(np.asarray(store.labels) >= 0)
+        rng = np.random.default_rng(self.seed)
+
+        def batches():
+            order = rng.permutation(labeled)
+            for start in range(0, len(order), self.batch_size):
+                # Linhas em ordem crescente dentro do lote: leituras mais sequenciais no mapeamento
+                rows = np.sort(order[start:start + self.batch_size])
+                yield store.padded(rows, max_len), store.labels[rows].astype(np.int32)
+
+        signature = (
+            tf.TensorSpec(shape=(None, max_len), dtype=tf.int32),
+            tf.TensorSpec(shape=(None,), dtype=tf.int32)
+        )
+        return tf.data.Dataset.from_generator(batches, output_signature=signature).prefetch(tf.data.AUTOTUNE)
+
+    def train(self, detector):
+        super().train(detector)
+        detector.training_info['sources'] = [source['path'] for source in self.store.metadata['sources']]
+        detector.training_info['store'] = os.path.abspath(self.store_dir)